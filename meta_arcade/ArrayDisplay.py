@@ -0,0 +1,382 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+from meta_arcade.BaseDisplay import BaseDisplay
+from meta_arcade.Elements import Wall
+
+# render backend which rasterizes directly into a numpy framebuffer.
+# no pygame/SDL is involved, so this is the fastest option for headless training.
+# the output closely matches the pygame backend (rectangles are pixel identical).
+
+# with antialias=True, shapes are drawn with their exact (fractional) pixel coverage
+# instead of being snapped to whole pixels. this is intended for rendering directly at
+# the observation resolution, where thin elements would otherwise flicker or vanish.
+
+# a scene only contains a handful of colors, so the image settings (color shifts and
+# inversion) are applied once per episode to a small palette instead of to every pixel.
+# without antialiasing the frame holds palette indices, which are expanded to colors with
+# a single lookup. with antialiasing the palette colors are blended directly into the frame.
+
+class ArrayDisplay(BaseDisplay):
+
+    colors_applied = True
+
+    def __init__(self, headless=True, w=250, h=250, episode_as_gif_path=None, obs_size=84,
+        antialias=False, record_every=1):
+
+        super().__init__(w, h, episode_as_gif_path, obs_size, record_every)
+
+        self.antialias = antialias
+        if antialias:
+            self.frame = np.zeros((h, w, 3), dtype=np.uint8)
+        else:
+            self.frame = np.zeros((h, w), dtype=np.uint8)
+
+        # stripes only depend on the resolution, so they are computed once
+        self.stripe_alpha = self.compute_stripes()
+        self.wall_idx = (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+        self.wall_alpha = np.zeros((0,1), dtype=np.float32)
+        self.stripe_clr = [0,0,0]
+
+        # static layer, and the parts of it covering the moving elements
+        self.static_frame = self.frame.copy()
+        self.static_cover = np.zeros((h, w) + self.frame.shape[2:], dtype=bool)
+
+
+    def compute_stripes(self, s=40, width=6):
+
+        # same lines as the pygame backend: from (0,k) to (k,0), i.e. x+y=k
+        if not self.antialias:
+            xy = np.arange(self.h)[:,None] + np.arange(self.w)[None,:]
+            mask = np.zeros((self.h, self.w), dtype=bool)
+            width = self.stroke(width)
+            for i in range(s):
+                k = int((i/(s-1))*self.h*2)
+                mask |= (xy - k >= -((width-1)//2)) & (xy - k <= width//2)
+            return mask.astype(np.float32)
+
+        # coverage of each pixel by the stripes, measured along x
+        xy = (np.arange(self.h)[:,None] + 0.5)/self.h + (np.arange(self.w)[None,:] + 0.5)/self.w
+        alpha = np.zeros((self.h, self.w), dtype=np.float32)
+        for i in range(s):
+            k = (int((i/(s-1))*self.REF_SIZE*2) + 0.5)/self.REF_SIZE
+            dist = np.abs(xy - k)*self.w
+            alpha = np.maximum(alpha, np.clip(self.stroke(width)*0.5 - dist + 0.5, 0.0, 1.0))
+        return alpha
+
+
+    def compute_wall_mask(self, game_elements, stripe_clr):
+
+        alpha = np.zeros((self.h, self.w), dtype=np.float32)
+        for g in game_elements:
+            if isinstance(g, Wall):
+                if self.antialias:
+                    x0, y0, x1, y1 = g.x*self.w, g.y*self.h, (g.x+g.w)*self.w, (g.y+g.h)*self.h
+                else:
+                    x, y, w, h = self.cvtRect(g.x, g.y, g.w, g.h)
+                    x0, y0, x1, y1 = x, y, x+w, y+h
+                cov = self.coverage(x0, y0, x1, y1)
+                if cov is not None:
+                    (cx0, cy0), a = cov
+                    region = alpha[cy0:cy0+a.shape[0], cx0:cx0+a.shape[1]]
+                    np.maximum(region, a, out=region)
+
+        alpha *= self.stripe_alpha
+        self.wall_idx = np.nonzero(alpha)
+        self.wall_alpha = alpha[self.wall_idx][:,None]
+        self.stripe_clr = stripe_clr
+
+
+    def draw_wall_texture(self):
+        if not self.antialias:
+            self.frame[self.wall_idx] = self.paint(self.stripe_clr)
+            return
+
+        px = self.frame[self.wall_idx].astype(np.float32)
+        px += (self.paint(self.stripe_clr).astype(np.float32) - px) * self.wall_alpha
+        self.frame[self.wall_idx] = np.rint(px)
+
+
+    def store_static_layer(self, cover):
+        self.static_frame[...] = self.frame
+
+        self.static_cover[...] = False
+        self.static_cover[self.wall_idx] = True
+        for x0, y0, x1, y1 in cover:
+            x0, y0, x1, y1 = self.clip_bounds(x0, y0, x1, y1)
+            self.static_cover[y0:y1, x0:x1] = True
+
+
+    def restore_static_layer(self):
+        self.frame[...] = self.static_frame
+
+
+    def restore_static_region(self, x0, y0, x1, y1):
+        x0, y0, x1, y1 = self.clip_bounds(x0, y0, x1, y1)
+        self.frame[y0:y1, x0:x1] = self.static_frame[y0:y1, x0:x1]
+
+
+    def restore_static_cover(self, bounds=None):
+        if bounds is None:
+            np.copyto(self.frame, self.static_frame, where=self.static_cover)
+        else:
+            x0, y0, x1, y1 = self.clip_bounds(*bounds)
+            np.copyto(self.frame[y0:y1, x0:x1], self.static_frame[y0:y1, x0:x1],
+                where=self.static_cover[y0:y1, x0:x1])
+
+
+    # ======================================================================
+    # Palette ==============================================================
+
+    def set_image_settings(self, invert=False, rotation=0, hshift=0.0, sshift=0.0, vshift=0.0):
+        super().set_image_settings(invert, rotation, hshift, sshift, vshift)
+
+        # colors are registered as they are drawn, and shifted once when registered
+        self.palette_index = {}
+        self.palette = np.zeros((256,3), dtype=np.uint8)
+        self.lut = np.zeros((256,3), dtype=np.uint8)
+
+
+    # value to write into the frame for this color: a palette index, or the
+    # shifted color itself when antialiasing
+    def paint(self, color):
+        key = tuple(color)
+        value = self.palette_index.get(key)
+        if value is None:
+            value = self.add_color(key)
+        return value
+
+
+    def add_color(self, key):
+        n = len(self.palette_index)
+        if n >= 256:
+            raise RuntimeError("ArrayDisplay supports at most 256 colors per episode")
+
+        self.palette[n] = np.asarray(key).astype(np.uint8)
+        self.apply_image_settings(self.palette[n:n+1].reshape(1,1,3), self.lut[n:n+1].reshape(1,1,3))
+
+        self.palette_index[key] = self.lut[n].copy() if self.antialias else n
+        return self.palette_index[key]
+
+
+    # ======================================================================
+    # Rasterization ========================================================
+
+    def clip_bounds(self, x0, y0, x1, y1):
+        return max(x0, 0), max(y0, 0), min(x1, self.w), min(y1, self.h)
+
+
+    def fill(self, color, x0, y0, x1, y1):
+        x0, y0, x1, y1 = self.clip_bounds(x0, y0, x1, y1)
+        if x1 > x0 and y1 > y0:
+            self.frame[y0:y1, x0:x1] = self.paint(color)
+
+
+    def fill_mask(self, color, x0, y0, mask):
+        # mask is defined over the (unclipped) box starting at x0, y0
+        mh, mw = mask.shape
+        cx0, cy0, cx1, cy1 = self.clip_bounds(x0, y0, x0+mw, y0+mh)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return
+        mask = mask[cy0-y0:cy1-y0, cx0-x0:cx1-x0]
+        self.frame[cy0:cy1, cx0:cx1][mask] = self.paint(color)
+
+
+    def pixel_rect(self, color, x, y, w, h, width=0):
+        if self.antialias:
+            self.cover_rect(color, x, y, w, h, width)
+            return
+
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        if width <= 0:
+            self.fill(color, x, y, x+w, y+h)
+        else:
+            self.fill(color, x, y, x+w, y+width)
+            self.fill(color, x, y+h-width, x+w, y+h)
+            self.fill(color, x, y, x+width, y+h)
+            self.fill(color, x+w-width, y, x+w, y+h)
+
+
+    def pixel_circle(self, color, center, r, width=0):
+        cx, cy = center
+        x0, y0 = cx-r, cy-r
+        dx = np.arange(x0, cx+r) + 0.5 - cx
+        dy = np.arange(y0, cy+r) + 0.5 - cy
+        d2 = dy[:,None]*dy[:,None] + dx[None,:]*dx[None,:]
+
+        mask = d2 <= r*r
+        if width > 0:
+            mask &= d2 > (r-width)*(r-width)
+        self.fill_mask(color, x0, y0, mask)
+
+
+    def pixel_line(self, color, p1, p2, width=1):
+        (x1, y1), (x2, y2) = p1, p2
+
+        # like pygame, thickness is measured along the minor axis of the line
+        offsets = np.arange(-((width-1)//2), width//2 + 1)
+        if abs(x2-x1) >= abs(y2-y1):
+            if x1 > x2:
+                (x1, y1), (x2, y2) = (x2, y2), (x1, y1)
+            xs = np.arange(x1, x2+1)
+            ys = np.rint(y1 + (xs-x1)*(y2-y1)/max(x2-x1, 1)).astype(int)
+            xs, ys = np.broadcast_arrays(xs[None,:], ys[None,:]+offsets[:,None])
+        else:
+            if y1 > y2:
+                (x1, y1), (x2, y2) = (x2, y2), (x1, y1)
+            ys = np.arange(y1, y2+1)
+            xs = np.rint(x1 + (ys-y1)*(x2-x1)/max(y2-y1, 1)).astype(int)
+            xs, ys = np.broadcast_arrays(xs[None,:]+offsets[:,None], ys[None,:])
+
+        inside = (xs >= 0) & (xs < self.w) & (ys >= 0) & (ys < self.h)
+        self.frame[ys[inside], xs[inside]] = self.paint(color)
+
+
+    # ======================================================================
+    # Antialiased rasterization ============================================
+
+    # with antialiasing, elements are drawn from their exact game coordinates
+    def draw_rect(self, color, x, y, w, h, width=0):
+        if not self.antialias:
+            return super().draw_rect(color, x, y, w, h, width)
+        self.cover_rect(color, x*self.w, y*self.h, w*self.w, h*self.h, self.stroke(width))
+
+    def draw_circle(self, color, cx, cy, r, width=0):
+        if not self.antialias:
+            return super().draw_circle(color, cx, cy, r, width)
+        self.cover_circle(color, cx*self.w, cy*self.h, r*self.w, self.stroke(width))
+
+    def draw_line(self, color, x1, y1, x2, y2, width=1):
+        if not self.antialias:
+            return super().draw_line(color, x1, y1, x2, y2, width)
+        self.cover_line(color, x1*self.w, y1*self.h, x2*self.w, y2*self.h, self.stroke(width))
+
+
+    # fractional coverage of the pixel grid by a rectangle [x0,x1) x [y0,y1)
+    # returns the clipped top-left pixel and the coverage array, or None if offscreen
+    def coverage(self, x0, y0, x1, y1):
+        i0, j0, i1, j1 = self.clip_bounds(int(np.floor(x0)), int(np.floor(y0)),
+            int(np.ceil(x1)), int(np.ceil(y1)))
+        if i1 <= i0 or j1 <= j0:
+            return None
+
+        # only the first and last row/column can be partially covered
+        cx = [1.0]*(i1-i0)
+        cx[0] = min(i0+1.0, x1) - max(i0, x0)
+        cx[-1] = min(i1, x1) - max(i1-1.0, x0)
+        cy = [1.0]*(j1-j0)
+        cy[0] = min(j0+1.0, y1) - max(j0, y0)
+        cy[-1] = min(j1, y1) - max(j1-1.0, y0)
+        return (i0, j0), np.multiply.outer(cy, cx)
+
+
+    # blend a color into the frame with per-pixel alpha, starting at pixel (x0,y0)
+    def blend(self, color, x0, y0, alpha):
+        region = self.frame[y0:y0+alpha.shape[0], x0:x0+alpha.shape[1]]
+        alpha = alpha[:,:,None]
+        region[:,:,:] = region*(1.0-alpha) + (self.paint(color)*alpha + 0.5)
+
+
+    def cover_box(self, color, x0, y0, x1, y1):
+
+        # whole pixel boxes (e.g. the background) don't need blending
+        if float(x0).is_integer() and float(y0).is_integer() and \
+            float(x1).is_integer() and float(y1).is_integer():
+            self.fill(color, int(x0), int(y0), int(x1), int(y1))
+            return
+
+        cov = self.coverage(x0, y0, x1, y1)
+        if cov is not None:
+            (i0, j0), alpha = cov
+            self.blend(color, i0, j0, alpha)
+
+
+    def cover_rect(self, color, x, y, w, h, width=0):
+        if width <= 0:
+            self.cover_box(color, x, y, x+w, y+h)
+        else:
+            width = min(width, w*0.5, h*0.5)
+            self.cover_box(color, x, y, x+w, y+width)
+            self.cover_box(color, x, y+h-width, x+w, y+h)
+            self.cover_box(color, x, y+width, x+width, y+h-width)
+            self.cover_box(color, x+w-width, y+width, x+w, y+h-width)
+
+
+    def cover_circle(self, color, cx, cy, r, width=0):
+        cov = self.coverage(cx-r-1.0, cy-r-1.0, cx+r+1.0, cy+r+1.0)
+        if cov is None:
+            return
+        (i0, j0), alpha = cov
+
+        dx = np.arange(i0, i0+alpha.shape[1]) + 0.5 - cx
+        dy = np.arange(j0, j0+alpha.shape[0]) + 0.5 - cy
+        d = np.sqrt(dy[:,None]*dy[:,None] + dx[None,:]*dx[None,:])
+
+        alpha = np.minimum(np.maximum(r - d + 0.5, 0.0), 1.0)
+        if width > 0:
+            alpha -= np.minimum(np.maximum(r - width - d + 0.5, 0.0), 1.0)
+        self.blend(color, i0, j0, alpha)
+
+
+    def cover_line(self, color, x1, y1, x2, y2, width=1):
+        pad = width*0.5 + 1.0
+        cov = self.coverage(min(x1,x2)-pad, min(y1,y2)-pad, max(x1,x2)+pad, max(y1,y2)+pad)
+        if cov is None:
+            return
+        (i0, j0), alpha = cov
+
+        # distance from each pixel center to the segment
+        px = np.arange(i0, i0+alpha.shape[1]) + 0.5
+        py = np.arange(j0, j0+alpha.shape[0]) + 0.5
+        ex, ey = x2-x1, y2-y1
+        length2 = max(ex*ex + ey*ey, 1e-9)
+        t = np.minimum(np.maximum(((px[None,:]-x1)*ex + (py[:,None]-y1)*ey) / length2, 0.0), 1.0)
+        dx = px[None,:] - (x1 + t*ex)
+        dy = py[:,None] - (y1 + t*ey)
+
+        alpha = np.minimum(np.maximum(width*0.5 - np.sqrt(dx*dx + dy*dy) + 0.5, 0.0), 1.0)
+        self.blend(color, i0, j0, alpha)
+
+
+    # rendered frame, with the image settings already applied to its colors
+    def get_pixels(self):
+        if self.antialias:
+            return self.frame
+        return np.take(self.lut, self.frame, axis=0, out=self.buffer("pixels", (self.h, self.w, 3)))
+
+
+    # the colors are already shifted, so only resizing and rotation remain
+    def image_state(self, out=None):
+
+        out = self.state_array(out)
+        self.record_frame()
+        ra = self.get_pixels()
+
+        if self.img_rot!=0:
+            ra = self.resize(ra, self.buffer("resized", out.shape))
+            np.copyto(out, np.rot90(ra, self.img_rot))
+            return out
+
+        ra = self.resize(ra, out)
+        if ra is not out:
+            np.copyto(out, ra)
+        return out
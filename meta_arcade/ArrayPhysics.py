@@ -0,0 +1,360 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+from meta_arcade.Elements import Block, Wall, BlueBullet, RedBullet, Player
+
+# alternative to stepping every game element through its own subtick:
+# blocks and walls are held in numpy arrays (structure of arrays) and the
+# interactions of all blocks are computed at once. the few moving elements
+# (player, balls, opponent, bullets) still run their own subtick, but only
+# against the blocks and walls they can possibly reach this tick.
+# the results match stepping the elements one by one in list order.
+#
+# with compiled=True, the blocks are handled by a numba kernel looping over them
+# in list order (self.kernels.py) instead of the numpy array operations.
+
+# margin for float rounding in the reachability test
+REACH_EPS = 1e-9
+
+# below this many blocks, the blocks run their own subtick as it is faster than
+# the array computations. blocks only interact with the other elements, not the walls
+MIN_ARRAY_BLOCKS = 8
+
+
+# change of the step score from one element, as in MetaArcade.step
+def add_score(dscore, edscore):
+    if edscore >= 100.0:
+        return 100.0, True
+    if edscore <= -100.0:
+        return -100.0, True
+    return dscore + edscore, False
+
+
+class ArrayPhysics():
+
+    def __init__(self, game_elements, static_grid, compiled=False):
+
+        # game elements are ordered as [blocks..., other elements..., walls...]
+        n = 0
+        while n < len(game_elements) and isinstance(game_elements[n], Block):
+            n += 1
+        m = len(game_elements)
+        while m > n and isinstance(game_elements[m-1], Wall):
+            m -= 1
+
+        self.blocks = game_elements[:n]
+        self.core = game_elements[n:m]
+        self.walls = game_elements[m:]
+        self.movers = [e for e in self.core if not e.static]
+
+        self.vectorized = len(self.blocks) >= MIN_ARRAY_BLOCKS
+        self.compiled = compiled
+        if compiled:
+            # numba is only imported when the compiled physics is used
+            from meta_arcade import physics_kernels
+            self.kernels = physics_kernels
+        self.element_blocks = [] if self.vectorized else self.blocks
+        self.moving_element_blocks = [e for e in self.element_blocks if e.vx or e.vy]
+
+        # elements of the kinds each kind interacts with, with and without the static ones
+        # (walls), which are taken from the static grid
+        self.static_grid = static_grid
+        self.partners = {}
+        self.moving_partners = {}
+        for e in self.movers + self.blocks[:1]:
+            kinds = e.interacts_with
+            self.partners[e.kind] = [o for o in self.element_blocks + self.core + self.walls if o.kind in kinds]
+            self.moving_partners[e.kind] = [o for o in self.partners[e.kind] if not o.static]
+
+        self.player = next((e for e in self.core if isinstance(e, Player)), None)
+        self.bbullet = next((e for e in self.core if isinstance(e, BlueBullet)), None)
+        self.rbullet = next((e for e in self.core if isinstance(e, RedBullet)), None)
+
+        if self.vectorized:
+            self.build_arrays()
+
+
+    # block state as arrays
+    def build_arrays(self):
+        b = self.blocks
+        self.bx = np.array([e.x for e in b], dtype=float)
+        self.by = np.array([e.y for e in b], dtype=float)
+        self.bw = np.array([e.w for e in b], dtype=float)
+        self.bh = np.array([e.h for e in b], dtype=float)
+        self.bvx = np.array([e.vx for e in b], dtype=float)
+        self.bvy = np.array([e.vy for e in b], dtype=float)
+        self.alive = np.array([e.alive for e in b], dtype=bool)
+        self.active = np.array([e.active for e in b], dtype=bool)
+        self.bad = [e.bad for e in b]
+        self.worth = [e.worth for e in b]
+        self.fall_points = [e.fall_points for e in b]
+        self.update_edges()
+
+        # block velocities never change, so only these blocks move and wrap around
+        self.block_speed = np.abs(self.bvx) + np.abs(self.bvy)
+        self.moving = np.flatnonzero(self.block_speed > 0.0).tolist()
+        self.moving_right = self.bvx > 0.0
+        self.moving_left = self.bvx < 0.0
+        self.moving_down = self.bvy > 0.0
+        self.neg_w = -self.bw
+        self.neg_h = -self.bh
+        self.safe_ticks = self.ticks_to_wrap()
+
+        if self.compiled:
+            self.bad = np.array(self.bad, dtype=bool)
+            self.worth = np.array(self.worth, dtype=float)
+            self.fall_points = np.array(self.fall_points, dtype=float)
+            self.others = np.zeros((3, 5))
+
+
+    # runs the game ticks of one step, returns the change in score and whether the game is over
+    def run(self, ticks):
+
+        dscore = 0.0
+        game_over = False
+        for rep in range(ticks):
+            if game_over: continue
+
+            if self.vectorized and self.compiled:
+                dscore, game_over = self.subtick_blocks_compiled(dscore)
+            elif self.vectorized:
+                dscore, game_over = self.subtick_blocks(dscore)
+            else:
+                for e in self.blocks:
+                    if game_over: break
+                    dscore, game_over = add_score(dscore, e.subtick(self.partners["block"]))
+
+            for e in self.movers:
+                if game_over: break
+                if "block" in e.interacts_with and self.vectorized:
+                    edscore = self.subtick_with_blocks(e)
+                else:
+                    edscore = e.subtick(self.candidates(e))
+                dscore, game_over = add_score(dscore, edscore)
+
+            self.tick()
+
+        self.sync()
+        return float(dscore), game_over
+
+
+    # right and bottom block edges, as computed in GameElement.check_collision
+    def update_edges(self):
+        self.br = self.bx + self.bw
+        self.bb = self.by + self.bh
+
+
+    # all blocks respond to wrapping around the screen and to collisions with
+    # the bullets and the player, in list order
+    def subtick_blocks(self, dscore):
+
+        x, y, r, b = self.bx, self.by, self.br, self.bb
+        alive = self.alive.copy()
+        checked = alive & self.active
+        scores = {}
+
+        # wrapping is only checked once blocks can have reached the edges
+        wrap_check = self.moving and not self.safe_ticks
+        if self.moving and not wrap_check:
+            self.safe_ticks -= 1
+        elif wrap_check:
+            wrap_right = self.moving_right & (x > 1.0)
+            wrap_left = self.moving_left & (x < self.neg_w)
+            wrap_bottom = self.moving_down & (y > 1.0) & ~(wrap_right | wrap_left)
+            wrapped = wrap_right | wrap_left | wrap_bottom
+            if wrapped.any():
+                x = np.where(wrap_right, self.neg_w, np.where(wrap_left, 1.0, x))
+                y = np.where(wrap_bottom, self.neg_h, y)
+                r, b = x + self.bw, y + self.bh
+
+                # blocks falling out alive return their fall points without further checks
+                fell = wrap_bottom & alive
+                for i in np.flatnonzero(fell).tolist():
+                    scores[i] = self.fall_points[i]
+                alive |= wrapped
+                checked = alive & self.active & ~fell
+
+        # each bullet can only be destroyed by the first block that touches it
+        killed = []
+        hit_bbullet = self.first_hit(x, y, r, b, checked, self.bbullet)
+        if hit_bbullet is not None:
+            checked[hit_bbullet] = False
+            killed.append(hit_bbullet)
+            scores[hit_bbullet] = self.worth[hit_bbullet]
+
+        hit_rbullet = self.first_hit(x, y, r, b, checked, self.rbullet)
+        if hit_rbullet is not None:
+            checked[hit_rbullet] = False
+            killed.append(hit_rbullet)
+            scores[hit_rbullet] = 0.0
+
+        if self.player is not None and self.player.active:
+            for i in np.flatnonzero(checked & self.overlaps(x, y, r, b, self.player)).tolist():
+                killed.append(i)
+                scores[i] = -100.0 if self.bad[i] else self.worth[i]
+
+        # blocks after one that ends the game are not processed
+        cutoff = len(self.blocks)
+        game_over = False
+        for i in sorted(scores):
+            dscore, game_over = add_score(dscore, scores[i])
+            if game_over:
+                cutoff = i + 1
+                break
+
+        for i in killed:
+            alive[i] = False
+        alive[cutoff:] = self.alive[cutoff:]
+        for i in np.flatnonzero(alive != self.alive).tolist():
+            self.blocks[i].alive = bool(alive[i])
+        self.alive = alive
+
+        if x is not self.bx:
+            self.bx[:cutoff] = x[:cutoff]
+            self.by[:cutoff] = y[:cutoff]
+            self.update_edges()
+        if wrap_check:
+            self.safe_ticks = self.ticks_to_wrap()
+
+        if hit_bbullet is not None and hit_bbullet < cutoff:
+            self.bbullet.active = False
+        if hit_rbullet is not None and hit_rbullet < cutoff:
+            self.rbullet.active = False
+
+        return dscore, game_over
+
+
+    # subtick_blocks with the numba kernel, the arrays are changed in place
+    def subtick_blocks_compiled(self, dscore):
+
+        others = self.others
+        for k, e in enumerate([self.bbullet, self.rbullet, self.player]):
+            if e is None or not e.active:
+                others[k, 0] = 0.0
+                continue
+            others[k] = (1.0, e.x + e.collision_adjust, e.x + e.w - e.collision_adjust,
+                e.y + e.collision_adjust, e.y + e.h - e.collision_adjust)
+
+        alive = self.alive.copy()
+        dscore, game_over, wrapped = self.kernels.subtick_blocks(self.bx, self.by, self.bw, self.bh, 
+            self.bvx, self.bvy, self.alive, self.active, self.bad, self.worth, self.fall_points, 
+            others, dscore)
+
+        for i in np.flatnonzero(alive != self.alive).tolist():
+            self.blocks[i].alive = bool(self.alive[i])
+        if wrapped:
+            self.update_edges()
+        if others[self.kernels.BLUE_BULLET, 0] == 0.0 and self.bbullet is not None:
+            self.bbullet.active = False
+        if others[self.kernels.RED_BULLET, 0] == 0.0 and self.rbullet is not None:
+            self.rbullet.active = False
+
+        return dscore, game_over
+
+
+    # number of following ticks in which no block can wrap around the screen,
+    # from the distance of the moving blocks to the edges (less one tick for rounding)
+    def ticks_to_wrap(self):
+        if not self.moving:
+            return 0
+        x, y = self.bx, self.by
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ticks = np.minimum.reduce([
+                np.where(self.moving_right, (1.0 - x - REACH_EPS) / self.bvx, np.inf),
+                np.where(self.moving_left, (x + self.bw - REACH_EPS) / -self.bvx, np.inf),
+                np.where(self.moving_down, (1.0 - y - REACH_EPS) / self.bvy, np.inf)])
+        return max(int(min(ticks.min(), 1e6)) - 1, 0)
+
+
+    # index of the first checked block colliding with a bullet, or None
+    def first_hit(self, x, y, r, b, checked, bullet):
+        if bullet is None or not bullet.active:
+            return None
+        hits = np.flatnonzero(checked & self.overlaps(x, y, r, b, bullet))
+        if not len(hits):
+            return None
+        return hits[0].item()
+
+
+    # blocks colliding with an element, as in GameElement.check_collision without projection
+    def overlaps(self, x, y, r, b, e):
+        el = e.x + e.collision_adjust
+        er = e.x + e.w - e.collision_adjust
+        et = e.y + e.collision_adjust
+        eb = e.y + e.h - e.collision_adjust
+        return (x < er) & (el < r) & (y < eb) & (et < b)
+
+
+    # elements interacting with blocks (balls) only check the alive blocks within reach, which
+    # are brought up to date before the subtick and read back afterwards as they can be destroyed
+    def subtick_with_blocks(self, e):
+
+        reach = abs(e.vx) + abs(e.vy) + self.block_speed + REACH_EPS
+        near = (self.bx - reach < e.x + e.w) & (e.x - reach < self.br)
+        near &= (self.by - reach < e.y + e.h) & (e.y - reach < self.bb)
+        near &= self.alive & self.active
+        idxs = np.flatnonzero(near).tolist()
+
+        self.write_blocks(idxs)
+        edscore = e.subtick([self.blocks[i] for i in idxs] + self.candidates(e))
+        for i in idxs:
+            block = self.blocks[i]
+            self.alive[i] = block.alive
+            self.active[i] = block.active
+        return edscore
+
+
+    # elements that a moving element can interact with this tick, in list order.
+    # its velocity can change during its subtick, by up to its speed
+    def candidates(self, e):
+
+        if not self.static_grid.enabled or "wall" not in e.interacts_with:
+            return self.partners[e.kind]
+
+        reach = abs(e.vx) + abs(e.vy) + getattr(e, "speed", 0.0) + REACH_EPS
+        return self.static_grid.near(e, reach, self.moving_partners[e.kind])
+
+
+    # copy block positions from the arrays to the block elements
+    def write_blocks(self, idxs):
+        x, y = self.bx.tolist(), self.by.tolist()
+        for i in idxs:
+            e = self.blocks[i]
+            e.x = x[i]
+            e.y = y[i]
+
+
+    def tick(self):
+        if self.vectorized and self.moving:
+            self.bx += self.bvx
+            self.by += self.bvy
+            self.update_edges()
+        for e in self.moving_element_blocks:
+            e.tick()
+        for e in self.movers:
+            e.tick()
+
+
+    # bring the block elements up to date for drawing
+    def sync(self):
+        if self.vectorized:
+            self.write_blocks(self.moving)
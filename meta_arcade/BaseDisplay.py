@@ -0,0 +1,428 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+import cv2
+from meta_arcade.image_settings import shift_colors
+from meta_arcade.EpisodeRecorder import EpisodeRecorder
+
+# base class for the render backends: handles coordinate conversion, the ui overlay,
+# and the creation of the gym image state from the rendered pixels.
+# subclasses provide the pixel-space drawing primitives and the wall texture.
+
+class BaseDisplay():
+
+    # line widths and the wall stripes are designed for a display of this size
+    REF_SIZE = 250
+
+    # above this fraction of the display, the whole frame is redrawn instead of the
+    # regions that changed
+    MAX_DAMAGE = 0.5
+
+    # True if get_pixels returns colors with the image settings already applied
+    colors_applied = False
+
+    def __init__(self, w=250, h=250, episode_as_gif_path=None, obs_size=84, record_every=1):
+
+        self.w, self.h = w, h
+        self.display_size = [w,h]
+        self.obs_size = obs_size
+        self.antialias = False
+        self.buffers = {}
+        self.set_image_settings()
+
+        # margin around element bounding boxes for strokes and rounding
+        self.draw_pad = int(np.ceil(self.stroke(3)*0.5)) + 1
+        self.last_shapes, self.last_bounds, self.last_score = None, None, None
+
+        self.episode_as_gif_path = episode_as_gif_path
+        self.recorder = None
+        if episode_as_gif_path is not None:
+            self.recorder = EpisodeRecorder(episode_as_gif_path, record_every)
+
+
+    # ======================================================================
+    # Backend specific =====================================================
+
+    # rectangle in pixel coordinates, outlined if width > 0
+    def pixel_rect(self, color, x, y, w, h, width=0):
+        raise NotImplementedError
+
+    # circle around a pixel center, outlined if width > 0
+    def pixel_circle(self, color, center, r, width=0):
+        raise NotImplementedError
+
+    # line between two pixel points
+    def pixel_line(self, color, p1, p2, width=1):
+        raise NotImplementedError
+
+    # build the striped wall texture for this episode
+    def compute_wall_mask(self, game_elements, stripe_clr):
+        raise NotImplementedError
+
+    # copy the wall texture over the current frame
+    def draw_wall_texture(self):
+        raise NotImplementedError
+
+    # current frame as an (h, w, 3) RGB uint8 array
+    def get_pixels(self):
+        raise NotImplementedError
+
+    # save the current frame as the static layer, with the regions to restore at
+    # the end of each frame given as pixel bounds (x0, y0, x1, y1)
+    def store_static_layer(self, cover):
+        raise NotImplementedError
+
+    # start a frame from the static layer
+    def restore_static_layer(self):
+        raise NotImplementedError
+
+    # copy a region of the static layer into the frame
+    def restore_static_region(self, x0, y0, x1, y1):
+        raise NotImplementedError
+
+    # copy the wall texture and cover regions of the static layer into the frame,
+    # optionally only within the pixel bounds (x0, y0, x1, y1)
+    def restore_static_cover(self, bounds=None):
+        raise NotImplementedError
+
+    # called once the frame is complete
+    def present(self):
+        pass
+
+
+    # ======================================================================
+    # Drawing in normalized game coordinates (used by game elements) =======
+
+    def draw_rect(self, color, x, y, w, h, width=0):
+        self.pixel_rect(color, *self.cvtRect(x, y, w, h), self.stroke(width))
+
+    def draw_circle(self, color, cx, cy, r, width=0):
+        self.pixel_circle(color, self.cvtPoint(cx, cy), self.cvtX(r), self.stroke(width))
+
+    def draw_line(self, color, x1, y1, x2, y2, width=1):
+        self.pixel_line(color, self.cvtPoint(x1, y1), self.cvtPoint(x2, y2), self.stroke(width))
+
+    # scale a line width given in pixels of the reference display size
+    def stroke(self, width):
+        if width <= 0:
+            return 0
+        width = width*self.display_size[0]/self.REF_SIZE
+        if self.antialias:
+            return width
+        return max(1, int(round(width)))
+
+
+    # ======================================================================
+    # Frame composition ====================================================
+
+    # everything that does not change during an episode (background, walls, wall texture
+    # and the ui apart from the score) is drawn once at reset into a static layer.
+    # cover_walls are the walls drawn after all moving elements, which have to be
+    # restored on top of them, together with the wall stripes and the ui bars
+    def compute_static_layer(self, game_elements, cover_walls, bg_color, actions_config, ui1, ui2, ui3):
+
+        self.score_color = ui2
+
+        self.pixel_rect(bg_color, 0.0, 0.0, self.display_size[0], self.display_size[1])
+        for e in game_elements:
+            if e.static:
+                e.render(self)
+
+        #display the wall texture mask
+        self.draw_wall_texture()
+
+        #display game progress
+        self.pixel_rect(ui1, 0.0, 0.0, self.display_size[0], self.display_size[1]*0.07)
+        self.pixel_rect(ui3, *self.cvtRect(0.01,0.02,0.98,0.03))
+
+        # display available actions
+        self.pixel_rect(ui1, 0.0, self.display_size[1]*0.93, self.display_size[0], self.display_size[1]*0.08)
+
+        for i,a in enumerate(["up", "down", "left", "right", "fire"]):
+
+            x = self.display_size[0]*((float(i)/5.0)+0.02)
+            y = self.display_size[1]*0.95
+            w = self.display_size[0]*(0.2 - 0.02*2)
+            h = self.display_size[1]*0.03
+
+            if actions_config[a]:
+                self.pixel_rect(ui2, x, y, w, h)
+
+            # on small displays the outline would cover the whole indicator,
+            # hiding whether the action is available
+            stroke = self.stroke(2)
+            if 2*stroke < (h if self.antialias else int(h)):
+                self.pixel_rect(ui3, x, y, w, h, stroke)
+
+        # the score is drawn over the top ui bar
+        self.score_bounds = self.pixel_bounds(0.0, 0.0, self.display_size[0], self.display_size[1]*0.07)
+
+        cover = [self.element_bounds(e.x, e.y, e.w, e.h) for e in cover_walls]
+        cover.append(self.score_bounds)
+        cover.append(self.pixel_bounds(0.0, self.display_size[1]*0.93, self.display_size[0], self.display_size[1]*0.08))
+        self.store_static_layer(cover)
+
+        # the next frame is drawn in full
+        self.last_shapes, self.last_bounds, self.last_score = None, None, None
+
+
+    # draw a frame: the static layer with the elements (from the first to the last moving
+    # element) on top, followed by the static cover and the score.
+    # the previous frame is kept, and only the regions where an element moved (or the score
+    # changed) are redrawn. these regions are grown to include every element overlapping
+    # them, so that elements are always drawn whole and in order
+    def render_frame(self, elements, score):
+
+        # the pixels drawn can change without their bounds changing (e.g. the end points
+        # of lines are rounded differently), so changes are detected in game coordinates
+        shapes = [e.draw_bounds() for e in elements]
+        bounds = [self.draw_bounds(b) for b in shapes]
+        damage = self.compute_damage(shapes, bounds, score)
+        self.last_shapes, self.last_bounds, self.last_score = shapes, bounds, score
+
+        if damage is None:
+            self.restore_static_layer()
+            for e in elements:
+                self.render_element(e)
+            self.restore_static_cover()
+            redraw_score = True
+
+        else:
+            regions, redraw, redraw_score = damage
+            for region in regions:
+                self.restore_static_region(*region)
+            for i in redraw:
+                self.render_element(elements[i])
+            for region in regions:
+                self.restore_static_cover(region)
+
+        #display game progress
+        if redraw_score and score>2.0:
+            x = 0.01
+            y = self.display_size[1]*0.02
+            h = self.display_size[1]*0.03
+            w = int(self.display_size[0]*abs(score)/100.0)*0.98
+            self.pixel_rect(self.score_color, x, y, w, h)
+
+        self.present()
+
+
+    def render_element(self, e):
+        if e.static:
+            self.restore_element(e)
+        else:
+            e.render(self)
+
+
+    # regions to redraw, the indices of the elements to draw in them and whether
+    # to draw the score, or None if the whole frame needs to be drawn
+    def compute_damage(self, shapes, bounds, score):
+
+        if self.last_shapes is None or len(shapes) != len(self.last_shapes):
+            return None
+
+        regions = []
+        redraw = set()
+        for i in range(len(shapes)):
+            if shapes[i] != self.last_shapes[i]:
+                region = self.union(self.last_bounds[i], bounds[i])
+                if region is not None:
+                    regions.append(region)
+                    redraw.add(i)
+        redraw_score = score != self.last_score
+        if redraw_score:
+            regions.append(self.score_bounds)
+
+        # add the elements overlapping a region, whose bounds can overlap more elements.
+        # the score is only drawn after restoring the whole bar beneath it
+        grown = True
+        while grown:
+            grown = False
+            for i, b in enumerate(bounds):
+                if b is None or i in redraw:
+                    continue
+                if any(self.overlaps(b, r) for r in regions):
+                    redraw.add(i)
+                    regions.append(b)
+                    grown = True
+            if not redraw_score and any(self.overlaps(self.score_bounds, r) for r in regions):
+                redraw_score = True
+                regions.append(self.score_bounds)
+                grown = True
+
+        area = sum((r[2]-r[0])*(r[3]-r[1]) for r in regions)
+        if area > self.MAX_DAMAGE*self.display_size[0]*self.display_size[1]:
+            return None
+        return regions, sorted(redraw), redraw_score
+
+
+    # pixel bounds of everything drawn in the area x, y, w, h given by an element's
+    # draw_bounds (including line widths), clipped to the display
+    def draw_bounds(self, shape):
+        if shape is None:
+            return None
+        x0, y0, x1, y1 = self.element_bounds(*shape)
+        x0, y0 = max(x0-self.draw_pad, 0), max(y0-self.draw_pad, 0)
+        x1, y1 = min(x1+self.draw_pad, self.display_size[0]), min(y1+self.draw_pad, self.display_size[1])
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+
+    def overlaps(self, a, b):
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    def union(self, a, b):
+        if a is None: return b
+        if b is None: return a
+        return min(a[0],b[0]), min(a[1],b[1]), max(a[2],b[2]), max(a[3],b[3])
+
+
+    # restore a static element that is drawn on top of moving elements
+    def restore_element(self, e):
+        self.restore_static_region(*self.element_bounds(e.x, e.y, e.w, e.h))
+
+
+    # pixel bounds (x0, y0, x1, y1) drawn by a rectangle in pixel coordinates
+    def pixel_bounds(self, x, y, w, h):
+        if self.antialias:
+            return int(np.floor(x)), int(np.floor(y)), int(np.ceil(x+w)), int(np.ceil(y+h))
+        return int(x), int(y), int(x)+int(w), int(y)+int(h)
+
+    # pixel bounds drawn by a rectangle in game coordinates
+    def element_bounds(self, x, y, w, h):
+        if self.antialias:
+            return self.pixel_bounds(x*self.display_size[0], y*self.display_size[1],
+                w*self.display_size[0], h*self.display_size[1])
+        x, y, w, h = self.cvtRect(x, y, w, h)
+        return x, y, x+w, y+h
+
+
+    # image settings are fixed for an episode, so they are set once at reset
+    def set_image_settings(self, invert=False, rotation=0, hshift=0.0, sshift=0.0, vshift=0.0):
+        self.img_invert = invert
+        self.img_rot = rotation
+        self.img_hue_shift = hshift
+        self.img_sat_shift = sshift
+        self.img_val_shift = vshift
+        self.hsv_shift = np.array([hshift, sshift, vshift], dtype=np.float32)
+
+
+    # the gym image state, written into out if given (an (obs_size, obs_size, 3) uint8
+    # C-contiguous array), otherwise into a new array. intermediate results are kept in
+    # preallocated buffers, so that no other arrays are allocated per frame
+    def image_state(self, out=None):
+
+        out = self.state_array(out)
+        self.record_frame()
+
+        ra = self.get_resized_pixels(self.buffer("resized", out.shape))
+
+        if self.img_rot==0:
+            return self.apply_image_settings(ra, out)
+
+        ra = self.apply_image_settings(ra, self.buffer("state", out.shape))
+        np.copyto(out, np.rot90(ra, self.img_rot))
+        return out
+
+
+    def state_array(self, out):
+        shape = (self.obs_size, self.obs_size, 3)
+        if out is None:
+            return np.empty(shape, dtype=np.uint8)
+        if out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError("out must be a C-contiguous uint8 array of shape " + str(shape))
+        return out
+
+
+    # frame resized to the observation size, using dst if needed
+    def get_resized_pixels(self, dst):
+        return self.resize(self.get_pixels(), dst)
+
+
+    # apply the color shifts and inversion to an (h, w, 3) RGB uint8 image, writing into out
+    def apply_image_settings(self, ra, out):
+        return shift_colors(ra, out, self.hsv_shift, self.img_invert,
+            self.buffer("hsv", ra.shape), self.buffer("hsv_float", ra.shape, np.float32))
+
+
+    # resize to the observation size, writing into dst. there is nothing to do
+    # when rendering at the observation resolution, and ra is returned instead
+    def resize(self, ra, dst):
+        if ra.shape[0] == self.obs_size and ra.shape[1] == self.obs_size:
+            return ra
+        return cv2.resize(ra, (self.obs_size,self.obs_size), dst=dst)
+
+
+    # preallocated array, reused between frames
+    def buffer(self, name, shape, dtype=np.uint8):
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buf
+        return buf
+
+
+    # ======================================================================
+    # Coordinate conversion ================================================
+
+    def cvtX(self, x):
+        return int(x*self.display_size[0])
+
+    def cvtY(self, y):
+        return int(y*self.display_size[1])
+
+    def cvtPoint(self, x, y):
+        return (self.cvtX(x), self.cvtY(y))
+
+    def cvtRect(self, x, y, w, h):
+        x = int(x*self.display_size[0])
+        y = int(y*self.display_size[1])
+        w = int(w*self.display_size[0])
+        h = int(h*self.display_size[1])
+        w = max(w,1) #make sure size is at least 1 pixel
+        h = max(h,1) #make sure size is at least 1 pixel
+        return x, y, w, h
+
+    # ======================================================================
+    # Episode recording ====================================================
+
+    def recording(self):
+        return self.recorder is not None and self.recorder.recording
+
+    # called at reset, after the image settings are set
+    def start_episode(self):
+        if self.recorder is not None:
+            self.recorder.start_episode(self.img_rot, self.hsv_shift, self.img_invert, self.colors_applied)
+
+    # the full resolution frame is recorded, with the image settings applied by the recorder
+    def record_frame(self):
+        if self.recording():
+            self.recorder.add_frame(np.array(self.get_pixels()))
+
+    def end_episode(self):
+        if self.recorder is not None:
+            self.recorder.end_episode()
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,201 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from bisect import bisect_left
+from meta_arcade.Elements import Block, BlueBullet, RedBullet
+from meta_arcade.GameElement import interaction_lists
+
+# broad phase collision culling for the subtick of the game elements.
+# the elements are sorted on the left edge of their bounding box, widened by the
+# distance they can move in a tick (sort and sweep on x). each element's subtick
+# then only receives the elements of the kinds it interacts with which it can collide
+# with, plus the ones it tracks regardless of distance, in game_elements order so the
+# results are unchanged.
+#
+# blocks and barriers placed on a grid are looked up in their lattice instead.
+#
+# during the subticks of a tick, only bullets (activated by the opponent) and
+# blocks wrapping around the screen change position, these are always candidates.
+
+# margin for float rounding
+REACH_EPS = 1e-9
+
+# elements wider than this are always tested instead of being sorted on x,
+# as they would widen the range searched by every query
+WIDE = 0.25
+
+# with fewer elements, every element is given all elements of the kinds it
+# interacts with, as this is faster, but the static ones are still taken from
+# the static grid (StaticGrid.py)
+MIN_ELEMENTS = 24
+
+
+# distance an element can move in a tick, its velocity can change during its subtick
+# by up to its speed
+def reach(e):
+    return abs(e.vx) + abs(e.vy) + getattr(e, "speed", 0.0) + REACH_EPS
+
+
+# bounding box of the element at index i, widened by its reach
+def swept_box(e, i):
+    r = reach(e)
+    return (e.x - r, e.x + e.w + r, e.y - r, e.y + e.h + r, i)
+
+
+# boxes sorted on their left edge
+class SortedBoxes():
+
+    def __init__(self, boxes):
+        self.wide = [b for b in boxes if b[1] - b[0] > WIDE]
+        self.boxes = sorted(b for b in boxes if b[1] - b[0] <= WIDE)
+        self.lefts = [b[0] for b in self.boxes]
+        self.max_width = max([b[1] - b[0] for b in self.boxes], default=0.0)
+
+    # appends the indices of the boxes overlapping l, r, t, b to out
+    def query(self, l, r, t, b, out):
+        boxes = self.boxes
+        for k in range(bisect_left(self.lefts, l - self.max_width), bisect_left(self.lefts, r)):
+            bl, br, bt, bb, i = boxes[k]
+            if l < br and bt < b and t < bb:
+                out.append(i)
+        for bl, br, bt, bb, i in self.wide:
+            if bl < r and l < br and bt < b and t < bb:
+                out.append(i)
+
+
+class BroadPhase():
+
+    def __init__(self, game_elements, elements_by_kind, static_grid, lattices=()):
+
+        self.game_elements = game_elements
+        self.order = {e: i for i, e in enumerate(game_elements)}
+        self.partners = interaction_lists(game_elements, elements_by_kind)
+        self.static_grid = static_grid
+        self.moving_partners = {k: [o for o in p if not o.static] for k, p in self.partners.items()}
+        self.enabled = len(game_elements) >= MIN_ELEMENTS
+        self.lattices = lattices
+        in_lattice = set(e for lattice in lattices for e in lattice.elements)
+
+        # bullets can be moved anywhere during a tick, movers are the other non-block elements
+        # that can move. static elements and blocks without velocity are sorted once
+        self.bullets = []
+        self.movers = []
+        self.moving_blocks = []
+        fixed = []
+        moving = []
+        for i, e in enumerate(game_elements):
+            if isinstance(e, (BlueBullet, RedBullet)):
+                self.bullets.append(i)
+            elif isinstance(e, Block):
+                if e.vx or e.vy:
+                    self.moving_blocks.append(i)
+                    if e not in in_lattice:
+                        moving.append(i)
+                elif e not in in_lattice:
+                    fixed.append(i)
+            elif e.static:
+                if e not in in_lattice:
+                    fixed.append(i)
+            else:
+                self.movers.append(i)
+
+        self.fixed = SortedBoxes([swept_box(game_elements[i], i) for i in fixed])
+        self.sorted_each_tick = moving + self.movers
+        self.tracked = {}
+        for i in self.movers:
+            kinds = game_elements[i].tracks
+            self.tracked[i] = [self.order[o] for k in kinds for o in elements_by_kind.get(k, [])]
+
+
+    # sorts the moving elements and finds the candidates of the movers,
+    # called at the start of each tick
+    def update(self):
+
+        if not self.enabled:
+            return
+
+        ge = self.game_elements
+        self.wrapping = [i for i in self.moving_blocks if ge[i].wraps()]
+        self.dynamic = sorted(self.bullets + self.wrapping)
+        self.dynamic_partners = {}
+
+        moving = [i for i in self.sorted_each_tick if i not in self.wrapping]
+        self.moving = SortedBoxes([swept_box(ge[i], i) for i in moving])
+
+        # candidates of the movers, and the movers near each other element
+        self.candidate_lists = {}
+        self.near_movers = {}
+        for i in self.movers:
+            near = self.query(ge[i])
+            for j in near:
+                self.near_movers.setdefault(j, []).append(i)
+            near = set(near + self.dynamic + self.tracked[i])
+            self.candidate_lists[i] = self.of_kinds(near, ge[i].interacts_with)
+
+
+    def query(self, e):
+        l, r, t, b, i = swept_box(e, None)
+        near = []
+        self.fixed.query(l, r, t, b, near)
+        self.moving.query(l, r, t, b, near)
+
+        for lattice in self.lattices:
+            cells = []
+            lattice.query(l, r, t, b, cells, REACH_EPS)
+            for o in cells:
+                bl, br, bt, bb, j = swept_box(o, None)
+                if bl < r and l < br and bt < b and t < bb:
+                    near.append(self.order[o])
+        return near
+
+
+    # elements at the given indices of the given kinds, in game_elements order
+    def of_kinds(self, idxs, kinds):
+        ge = self.game_elements
+        return [ge[j] for j in sorted(idxs) if ge[j].kind in kinds]
+
+
+    # elements that e can interact with in its subtick, in game_elements order
+    def candidates(self, e):
+
+        if not self.enabled:
+            if self.static_grid.enabled and "wall" in e.interacts_with:
+                return self.static_grid.near(e, reach(e), self.moving_partners[e.kind])
+            return self.partners[e.kind]
+
+        i = self.order[e]
+        if i in self.candidate_lists:
+            return self.candidate_lists[i]
+
+        # a wrapping block checks for collisions at its new position
+        if i in self.wrapping:
+            return self.partners[e.kind]
+
+        # bullets are looked up at their current position
+        if i in self.bullets:
+            return self.of_kinds(set(self.query(e) + self.dynamic), e.interacts_with)
+
+        movers = self.near_movers.get(i)
+        if movers is None:
+            if e.kind not in self.dynamic_partners:
+                self.dynamic_partners[e.kind] = self.of_kinds(self.dynamic, e.interacts_with)
+            return self.dynamic_partners[e.kind]
+        return self.of_kinds(set(movers + self.dynamic), e.interacts_with)
@@ -33,9 +33,102 @@ import random
 def make_config(cfg):
     return MAConfig(cfg)
 
+
+# parsed config files are cached for the whole process, so that the many configs
+# built for curricula and environment pools do not read and parse the same files.
+# configs loaded from the cache share its dictionaries until they are first written to
+PREDEFINED_GAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "predefined_games")
+
+predefined_games = None
+config_files = {}
+
+
+# predefined game from this package, all games are read in one pass on first use
+def load_predefined_game(name):
+    global predefined_games
+    if predefined_games is None:
+        games = {}
+        for file_name in os.listdir(PREDEFINED_GAMES_DIR):
+            if file_name.endswith(".json"):
+                with open(os.path.join(PREDEFINED_GAMES_DIR, file_name)) as f:
+                    games[file_name] = json.load(f)
+        predefined_games = games
+
+    if name not in predefined_games:
+        raise FileNotFoundError("no predefined game '{}'".format(name[:-5]))
+    return predefined_games[name]
+
+
+# json config file, read again when its modification time changes
+def load_config_file(path):
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = config_files.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = (mtime, json.load(f))
+        config_files[path] = cached
+    return cached[1]
+
+
+# copy of a list of values, including nested lists
+def copy_list(values):
+    return [copy_list(v) if isinstance(v, list) else v for v in values]
+
+
+# flat, read only record of the values a game reads while it runs, taken once
+# per reset from the config values sampled for the episode
+class ConfigSnapshot:
+
+    __slots__ = ("up", "down", "left", "right", "fire", "max_episode_length", 
+        "background_color", "ui_color", "indicator_color_1", "indicator_color_2",
+        "color_inversion", "rotation", "hue_shift", "saturation_shift", "value_shift")
+
+    def __init__(self, values):
+        actions = values["actions"]
+        display = values["display_settings"]
+        image = values.get("image_settings", {})
+
+        fields = {
+            "up": bool(actions["up"]),
+            "down": bool(actions["down"]),
+            "left": bool(actions["left"]),
+            "right": bool(actions["right"]),
+            "fire": bool(actions["fire"]),
+            "max_episode_length": values["meta"].get("max_episode_length", 5000.0),
+            "background_color": display["background_color"],
+            "ui_color": display["ui_color"],
+            "indicator_color_1": display["indicator_color_1"],
+            "indicator_color_2": display["indicator_color_2"],
+            "color_inversion": image.get("color_inversion", False),
+            "rotation": image.get("rotation", 0),
+            "hue_shift": image.get("hue_shift", 0.0),
+            "saturation_shift": image.get("saturation_shift", 0.0),
+            "value_shift": image.get("value_shift", 0.0),
+        }
+        for k, v in fields.items():
+            object.__setattr__(self, k, v)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ConfigSnapshot is read only")
+
+    def __delattr__(self, key):
+        raise AttributeError("ConfigSnapshot is read only")
+
 class MAConfig:
 
-    def __init__(self, config):
+    def __init__(self, config, parent=None, key=None):
+
+        # whether original_dict is shared with the file cache,
+        # it is then copied before being written to
+        self.shared = False
+
+        # config section at parent.original_dict[key], which is looked up
+        # on access so that it follows the parent when it is copied
+        self.parent = parent
+        self.key = key
+        if parent is not None:
+            return
 
         # if config is string, load json into dict
         # otherwise it should be a dictionary
@@ -47,16 +140,14 @@ class MAConfig:
 
             # explicit path
             if "/" in config or "\\" in config:
-                with open(config) as f:
-                    config = json.load(f)
+                config = load_config_file(config)
             
             # predefined game file in this package
             else:
-                file_path = os.path.dirname(os.path.abspath(__file__))
-                with open(file_path+"/predefined_games/"+config) as f:
-                    config = json.load(f)
+                config = load_predefined_game(config)
 
             self.original_dict = config
+            self.shared = True
 
         elif isinstance(config, dict):
             self.original_dict = config
@@ -65,7 +156,19 @@ class MAConfig:
             raise ValueError("config accepts game name, json file path, or dictionary.")
 
 
+    @property
+    def original_dict(self):
+        if self.parent is not None:
+            return self.parent.original_dict[self.key]
+        return self.config_dict
+
+    @original_dict.setter
+    def original_dict(self, config):
+        self.config_dict = config
+
     def parameter_dictionary(self):
+        # the dictionary is given out for writing
+        self.unshare()
         return self.original_dict
 
     # override bracket access operator: object[key]
@@ -84,20 +187,20 @@ class MAConfig:
                     high = value["high"]
                     return self.sample_uniform(low, high)
                 elif value["distribution"]=="color":
-                    #add defaults
-                    if "hrange" not in value: value["hrange"]=[0.0, 1.0]
-                    if "lrange" not in value: value["lrange"]=[0.0, 1.0]
-                    if "srange" not in value: value["srange"]=[0.0, 1.0]
+                    #defaults
+                    hrange = value.get("hrange", [0.0, 1.0])
+                    lrange = value.get("lrange", [0.0, 1.0])
+                    srange = value.get("srange", [0.0, 1.0])
 
                     #sample
-                    h = random.uniform(value["hrange"][0], value["hrange"][1])
+                    h = random.uniform(hrange[0], hrange[1])
                     if h<0.0:
                         h += 1.0
                     if h>1.0:
                         h -= 1.0
 
-                    l = random.uniform(value["lrange"][0], value["lrange"][1])
-                    s = random.uniform(value["srange"][0], value["srange"][1])
+                    l = random.uniform(lrange[0], lrange[1])
+                    s = random.uniform(srange[0], srange[1])
                     rgb = list(colorsys.hls_to_rgb(h, l, s))
 
                     for i in range(3):
@@ -108,13 +211,38 @@ class MAConfig:
                 else:
                     raise ValueError("'distribution' must have type 'normal', 'uniform', or 'color'")
             else:
-                value = MAConfig(value)
+                value = MAConfig(value, self, key)
+
+        # lists are copied, as the dictionary can be shared with the file
+        # cache and with other configs. values are changed by assignment
+        elif isinstance(value, list):
+            value = copy_list(value)
 
         return value
 
     # bracket assignment operator (config is read only)
     def __setitem__(self, key, value):
-        self.original_dict[key] = value
+        self.set_path((key,), value)
+
+    # sets the value at a path of keys, sections write through their parent
+    def set_path(self, path, value):
+        if self.parent is not None:
+            self.parent.set_path((self.key,) + path, value)
+            return
+        self.unshare()
+        d = self.config_dict
+        for key in path[:-1]:
+            d = d[key]
+        d[path[-1]] = value
+
+    # copies a shared dictionary before it is written to,
+    # the whole config is copied once
+    def unshare(self):
+        if self.parent is not None:
+            self.parent.unshare()
+        elif self.shared:
+            self.config_dict = copy.deepcopy(self.config_dict)
+            self.shared = False
 
     # in operator
     def __contains__(self, key):
@@ -130,14 +258,70 @@ class MAConfig:
                     values[k] = self[k]
                 else:
                     values[k] = self[k].sample_constant_values()
+            elif isinstance(value, MAConfig):
+                # interpolated configs hold their sections as configs
+                values[k] = value.sample_constant_values()
             else:
                 values[k] = self[k]
         return values
 
     def copy(self):
+        # a config still shared with the file cache can share it with its copy
+        if self.shared:
+            config = MAConfig(self.original_dict)
+            config.shared = True
+            return config
         d = copy.deepcopy(self.original_dict)
         return MAConfig(d)
 
+    # variant of this config differing in the given values, a nested dict of the
+    # sections and parameters to change. see ConfigOverlay
+    def variant(self, changes=None):
+        return ConfigOverlay(self, changes)
+
+
+    # ======================================================================
+    # Batch Sampling =======================================================
+
+
+    # samples k configs at once with a numpy random generator, each distribution being
+    # drawn with one vectorized call. returns the columns of the configs: a dict from the
+    # path of each distribution (a tuple of keys) to an array of its k values
+    def sample_columns(self, k, rng=None, path=()):
+        if rng is None:
+            rng = np.random.default_rng()
+
+        columns = {}
+        for key, value in self.original_dict.items():
+            if isinstance(value, dict):
+                if "distribution" in value:
+                    columns[path+(key,)] = sample_column(value, k, rng)
+                else:
+                    columns.update(MAConfig(value).sample_columns(k, rng, path+(key,)))
+            elif isinstance(value, MAConfig):
+                columns.update(value.sample_columns(k, rng, path+(key,)))
+        return columns
+
+
+    # constant values of the i-th config sampled into columns, as given by sample_constant_values
+    def values_at(self, columns, i, path=()):
+        values = {}
+        for key, value in self.original_dict.items():
+            if isinstance(value, dict) and "distribution" in value:
+                v = columns[path+(key,)][i]
+                if isinstance(v, (np.ndarray, np.generic)):
+                    v = v.tolist()
+                values[key] = v
+            elif isinstance(value, dict):
+                values[key] = MAConfig(value).values_at(columns, i, path+(key,))
+            elif isinstance(value, MAConfig):
+                values[key] = value.values_at(columns, i, path+(key,))
+            elif isinstance(value, list):
+                values[key] = copy_list(value)
+            else:
+                values[key] = value
+        return values
+
     # ======================================================================
     # Sampling and Interpolation ===========================================
 
@@ -199,4 +383,286 @@ class MAConfig:
             else:
                 interp_config[k] = self.interpolate(value, otherv, amt)
 
-        return MAConfig(interp_config)
\ No newline at end of file
+        return MAConfig(interp_config)
+
+
+
+# k samples of a distribution as an array, (k,) for a number or (k, n) for a list of n
+def sample_column(dist, k, rng):
+
+    if dist["distribution"]=="gaussian" or dist["distribution"]=="normal":
+        mean, std = dist["mean"], dist["std"]
+        if not isinstance(mean, list):
+            return normal_column(mean, std, k, rng)
+        values = [normal_column(mean[i], std[i], k, rng) for i in range(len(mean))]
+
+        #special case: colors
+        if isinstance(mean[0], int) and len(mean)==3:
+            values = [np.clip(v, 0, 255) for v in values]
+        return stack_columns(values)
+
+    elif dist["distribution"]=="uniform":
+        interp = rng.uniform(0.0, 1.0, k)
+        return interpolate_column(dist["low"], dist["high"], interp)
+
+    elif dist["distribution"]=="color":
+        hrange = dist.get("hrange", [0.0, 1.0])
+        lrange = dist.get("lrange", [0.0, 1.0])
+        srange = dist.get("srange", [0.0, 1.0])
+
+        h = rng.uniform(hrange[0], hrange[1], k)
+        h = np.where(h<0.0, h+1.0, h)
+        h = np.where(h>1.0, h-1.0, h)
+        l = rng.uniform(lrange[0], lrange[1], k)
+        s = rng.uniform(srange[0], srange[1], k)
+        return (hls_to_rgb(h, l, s)*255.0).astype(int)
+
+    else:
+        raise ValueError("'distribution' must have type 'normal', 'uniform', or 'color'")
+
+
+def normal_column(mean, std, k, rng):
+    values = rng.normal(mean, std, k)
+    if isinstance(mean, int):
+        values = values.astype(int)
+    return values
+
+
+# as MAConfig.interpolate, for an array of amounts
+def interpolate_column(v1, v2, amt):
+    if isinstance(v1, list):
+        return stack_columns([interpolate_column(v1[i], v2[i], amt) for i in range(len(v1))])
+    elif isinstance(v1, bool) or isinstance(v1, str):
+        return np.full(len(amt), v1, dtype=object)
+    elif isinstance(v1, float):
+        return (v2 - v1)*amt + v1
+    elif isinstance(v1, int):
+        return np.round((float(v2) - float(v1))*amt + v1).astype(int)
+
+
+# columns of the elements of a list as a (k, n) array, which holds
+# python objects if the elements have different types
+def stack_columns(values):
+    if len(set(v.dtype for v in values)) > 1:
+        values = [v.astype(object) for v in values]
+    return np.stack(values, axis=1)
+
+
+# colorsys.hls_to_rgb for arrays, returns (k, 3) rgb values in [0, 1]
+def hls_to_rgb(h, l, s):
+    m2 = np.where(l <= 0.5, l*(1.0+s), l+s-(l*s))
+    m1 = 2.0*l - m2
+    rgb = np.stack([hue_value(m1, m2, h+(1.0/3.0)), hue_value(m1, m2, h), hue_value(m1, m2, h-(1.0/3.0))], axis=1)
+
+    # no saturation is gray
+    gray = s == 0.0
+    rgb[gray] = l[gray, None]
+    return rgb
+
+
+def hue_value(m1, m2, hue):
+    hue = np.mod(hue, 1.0)
+    return np.select([hue < 1.0/6.0, hue < 0.5, hue < 2.0/3.0],
+        [m1 + (m2-m1)*hue*6.0, m2, m1 + (m2-m1)*(2.0/3.0-hue)*6.0], m1)
+
+
+
+# config made of a base config and a sparse set of changes, which is created in
+# constant time and does not copy the base. the full dictionary is only built on
+# first read, copying just the sections that changed, and is then kept until the
+# next change. the base config should not be changed while it has overlays
+class ConfigOverlay(MAConfig):
+
+    # changes are merged into the sections of the base, and are copied so that
+    # later edits of the given dictionary do not change the overlay
+    def __init__(self, base, changes=None):
+        if not isinstance(base, MAConfig):
+            base = MAConfig(base)
+
+        super().__init__({})
+        self.base = base
+        self.changes = copy.deepcopy(changes) if changes is not None else {}
+        self.merged = None
+
+        # paths of the values assigned whole, which replace the value of the base
+        # instead of being merged into it
+        self.replaced = set()
+
+    @property
+    def original_dict(self):
+        if self.merged is None:
+            self.merged = merge_changes(self.base.original_dict, self.changes, self.replaced)
+        return self.merged
+
+    @original_dict.setter
+    def original_dict(self, config):
+        pass
+
+    def set_path(self, path, value):
+        changes = self.changes
+        for key in path[:-1]:
+            if not isinstance(changes.get(key), dict) or "distribution" in changes[key]:
+                changes[key] = {}
+            changes = changes[key]
+        changes[path[-1]] = value
+
+        # as with assignment on a config, a section assigned whole replaces the old one
+        n = len(path)
+        self.replaced = set(p for p in self.replaced if p[:n] != path)
+        self.replaced.add(path)
+        self.merged = None
+
+    # the dictionary (or one of its sections) is given out for writing, and it shares
+    # the unchanged sections with the base, so the overlay takes its own copy of it
+    def unshare(self):
+        self.base = MAConfig(copy.deepcopy(self.original_dict))
+        self.changes = {}
+        self.replaced = set()
+        self.merged = None
+
+    def parameter_dictionary(self):
+        self.unshare()
+        return self.original_dict
+
+    def copy(self):
+        config = ConfigOverlay(self.base, self.changes)
+        config.replaced = set(self.replaced)
+        return config
+
+
+
+# values of base with the sections and parameters in changes replaced, sections
+# in changes are merged into those of base unless their path is in replaced.
+# base is not modified and shares the sections without changes
+def merge_changes(base, changes, replaced=(), path=()):
+    if isinstance(base, MAConfig):
+        base = base.original_dict
+    if not changes:
+        return base
+
+    merged = dict(base)
+    for key, value in changes.items():
+        section = merged.get(key)
+        if (isinstance(value, dict) and "distribution" not in value and 
+            isinstance(section, (dict, MAConfig)) and "distribution" not in section and
+            path + (key,) not in replaced):
+            merged[key] = merge_changes(section, value, replaced, path + (key,))
+        else:
+            merged[key] = value
+    return merged
+
+
+
+# interpolation of config1 towards config2 as given by interpolate_towards, compiled once.
+# only the numbers which differ between the configs (constants or distribution
+# parameters) are interpolated, all at once, and the other values are shared with
+# config1 through a ConfigOverlay. progress is quantized to PROGRESS_STEPS steps
+# and the configs of the last CACHE_SIZE steps are kept
+class InterpolationPlan:
+
+    PROGRESS_STEPS = 10000
+    CACHE_SIZE = 64
+
+    def __init__(self, config1, config2):
+        self.config1 = config1
+
+        # values containing interpolated numbers, replaced whole in the overlay:
+        # their path of keys, the value of config1, and the positions of the
+        # numbers in the value with their index in the arrays below
+        self.roots = []
+        low, high, is_int = [], [], []
+
+        # as in interpolate_towards, the entries of config1 are interpolated, and config1's
+        # value is kept where config2 does not have the entry or has a different type
+        def add_leaves(root, v1, v2, position):
+            if isinstance(v1, MAConfig):
+                v1 = v1.original_dict
+            if isinstance(v2, MAConfig):
+                v2 = v2.original_dict
+
+            if isinstance(v1, dict) and "distribution" in v1:
+                keys = [k for k in ["low", "high", "mean", "std", "hrange", "lrange", "srange"] if k in v1]
+            elif isinstance(v1, dict):
+                keys = list(v1)
+            elif isinstance(v1, list):
+                keys = range(len(v1))
+            elif isinstance(v1, bool) or isinstance(v1, str):
+                return
+            elif isinstance(v1, (int, float)) and v2 != v1:
+                if isinstance(v2, bool) or not isinstance(v2, (int, float)):
+                    return
+                root[2].append((position, len(low)))
+                low.append(float(v1))
+                high.append(float(v2))
+                is_int.append(isinstance(v1, int))
+                return
+            else:
+                return
+
+            if not isinstance(v2, type(v1)):
+                return
+            for k in keys:
+                if (k in v2) if isinstance(v2, dict) else (k < len(v2)):
+                    add_leaves(root, v1[k], v2[k], position + (k,))
+
+        def add_roots(d1, d2, path):
+            for k in d1:
+                if k not in d2:
+                    continue
+                value, otherv = d1[k], d2[k]
+                if isinstance(value, MAConfig):
+                    value = value.original_dict
+                if isinstance(otherv, MAConfig):
+                    otherv = otherv.original_dict
+
+                if isinstance(value, dict) and "distribution" not in value:
+                    if isinstance(otherv, dict):
+                        add_roots(value, otherv, path + (k,))
+                else:
+                    root = (path + (k,), value, [])
+                    add_leaves(root, value, otherv, ())
+                    if root[2]:
+                        self.roots.append(root)
+
+        add_roots(config1.original_dict, config2.original_dict, ())
+
+        self.low = np.array(low)
+        self.high = np.array(high)
+        self.is_int = np.array(is_int, dtype=bool)
+        self.cache = {}
+
+
+    def at(self, progress):
+        step = int(round(progress * self.PROGRESS_STEPS))
+        config = self.cache.get(step)
+        if config is None:
+            config = self.interpolate(step / self.PROGRESS_STEPS)
+            if len(self.cache) >= self.CACHE_SIZE:
+                del self.cache[next(iter(self.cache))]
+            self.cache[step] = config
+        return config
+
+
+    def interpolate(self, amt):
+        values = (self.high - self.low)*amt + self.low
+        values = np.where(self.is_int, np.round(values), values).tolist()
+
+        changes = {}
+        for path, value, leaves in self.roots:
+            value = copy.deepcopy(value)
+            for position, i in leaves:
+                v = int(values[i]) if self.is_int[i] else values[i]
+                if not position:
+                    value = v
+                    continue
+                container = value
+                for k in position[:-1]:
+                    container = container[k]
+                container[position[-1]] = v
+
+            section = changes
+            for k in path[:-1]:
+                section = section.setdefault(k, {})
+            section[path[-1]] = value
+
+        return ConfigOverlay(self.config1, changes)
@@ -19,7 +19,6 @@ WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR
 IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import pygame
 import random
 import math
 import numpy as np
@@ -29,6 +28,10 @@ from meta_arcade.GameElement import GameElement
 
 class Player(GameElement):
 
+    __slots__ = ("speed", "shoots", "steering")
+    kind = "player"
+    interacts_with = ("wall", "red_bullet")
+
     def __init__(self, w, h, speed, color=[255,255,255], shoots=False, steering=0.0, prng=None):
 
         x = 0.5 - w*0.5
@@ -48,7 +51,13 @@ class Player(GameElement):
             y = self.y - 0.02
             w = tw*2
             h = 0.03
-            pygame.draw.rect(display.display, self.fill, pygame.Rect(*display.cvtRect(x, y, w, h)))
+            display.draw_rect(self.fill, x, y, w, h)
+
+    def draw_bounds(self):
+        if not self.active: return None
+        if self.shoots:
+            return self.x, self.y - 0.02, self.w, self.h + 0.02
+        return self.x, self.y, self.w, self.h
 
 
     def subtick(self, game_elements):
@@ -57,8 +66,8 @@ class Player(GameElement):
 
             # walls
             if isinstance(e, Wall):
-                if self.check_collision(e, propogate_x=True): self.vx *= 0.0
-                if self.check_collision(e, propogate_y=True): self.vy *= 0.0
+                if self.check_collision(e, propogate_x=True, swept=True): self.vx *= 0.0
+                if self.check_collision(e, propogate_y=True, swept=True): self.vy *= 0.0
 
             # enemy bullet
             if isinstance(e, RedBullet):
@@ -77,6 +86,11 @@ class Player(GameElement):
 
 class Opponent(GameElement):
 
+    __slots__ = ("speed", "skill", "tracks_ball", "shoots", "state")
+    kind = "opponent"
+    interacts_with = ("wall", "ball", "blue_bullet", "red_bullet")
+    tracks = ("ball", "blue_bullet", "red_bullet")
+
     def __init__(self, w, h, speed, color=[209, 46, 73], skill=0.5, tracks_ball=True, 
         shoots=False, prng=None):
 
@@ -101,7 +115,13 @@ class Opponent(GameElement):
             y = self.y + self.h - 0.01
             w = tw*2
             h = 0.03
-            pygame.draw.rect(display.display, self.fill, pygame.Rect(*display.cvtRect(x, y, w, h)))
+            display.draw_rect(self.fill, x, y, w, h)
+
+    def draw_bounds(self):
+        if not self.active: return None
+        if self.shoots:
+            return self.x, self.y, self.w, self.h + 0.02
+        return self.x, self.y, self.w, self.h
 
 
     def react_to_bullet(self, e):
@@ -194,6 +214,10 @@ class Opponent(GameElement):
 
 class Ball(GameElement):
 
+    __slots__ = ("speed", "harmful")
+    kind = "ball"
+    interacts_with = ("wall", "block", "player", "opponent")
+
     def __init__(self, w, speed, color=[255, 192, 56], harmful=False, prng=None):
         super().__init__(0.5, 0.5, w, w, fill=color, stroke=color, centered=True, prng=prng)
         self.speed = speed
@@ -209,20 +233,21 @@ class Ball(GameElement):
 
 
     def draw(self, display):
-        r = display.cvtX(self.w*0.5)
+        r = self.w*0.5
+        cx, cy = self.x+self.w*0.5, self.y+self.w*0.5
 
         if self.harmful:
 
-            w = (2 if r>= 2 else 1)
+            w = (2 if display.cvtX(r)>= 2 else 1)
             w = max(w, 1)
-            pygame.draw.circle(display.display, self.stroke, display.cvtPoint(self.x+self.w*0.5, self.y+self.w*0.5), r, w)
-            # pygame.draw.line(display.display, self.stroke, display.cvtPoint(p1x,p1y), display.cvtPoint(p2x,p2y), 1)
-            # pygame.draw.line(display.display, self.stroke, display.cvtPoint(p3x,p3y), display.cvtPoint(p4x,p4y), 1)
+            display.draw_circle(self.stroke, cx, cy, r, w)
+            # display.draw_line(self.stroke, p1x, p1y, p2x, p2y, 1)
+            # display.draw_line(self.stroke, p3x, p3y, p4x, p4y, 1)
 
         else:
-            pygame.draw.circle(display.display, self.fill, display.cvtPoint(self.x+self.w*0.5, self.y+self.w*0.5), r)
-            w = (2 if r>= 2 else 1)
-            pygame.draw.circle(display.display, self.stroke, display.cvtPoint(self.x+self.w*0.5, self.y+self.w*0.5), r, w)
+            display.draw_circle(self.fill, cx, cy, r)
+            w = (2 if display.cvtX(r)>= 2 else 1)
+            display.draw_circle(self.stroke, cx, cy, r, w)
 
 
     def subtick(self, game_elements):
@@ -234,8 +259,8 @@ class Ball(GameElement):
             if isinstance(e, Wall):
                 # if embedded in a wall we need to just keep moving to get out of it:
                 if not self.check_collision(e):
-                    if self.check_collision(e, propogate_x=True): self.vx *= -1.0
-                    if self.check_collision(e, propogate_y=True): self.vy *= -1.0
+                    if self.check_collision(e, propogate_x=True, swept=True): self.vx *= -1.0
+                    if self.check_collision(e, propogate_y=True, swept=True): self.vy *= -1.0
 
             # blocks
             if isinstance(e, Block) and e.alive:
@@ -243,14 +268,14 @@ class Ball(GameElement):
                 if not self.check_collision(e):
 
                     cardinal_collision = False
-                    if self.check_collision(e, propogate_x=True): 
+                    if self.check_collision(e, propogate_x=True, swept=True): 
                         self.vx *= -1.0
                         if not self.harmful and not e.bad:
                             cardinal_collision = True
                             e.alive = False
                             e.destroy()
                             block_collisions += e.worth
-                    if self.check_collision(e, propogate_y=True): 
+                    if self.check_collision(e, propogate_y=True, swept=True): 
                         self.vy *= -1.0
                         if not self.harmful and not e.bad:
                             cardinal_collision = True
@@ -311,6 +336,11 @@ class Ball(GameElement):
 
 
 class Wall(GameElement):
+
+    __slots__ = ()
+    static = True
+    kind = "wall"
+
     def __init__(self, x, y, w, h, color=[141, 165, 204], centered=False):
         super().__init__(x, y, w, h, fill=color, stroke=color, centered=centered)
 
@@ -325,10 +355,15 @@ class Wall(GameElement):
         self.fill, self.stroke = color, color
 
     def draw(self, display):
-        pygame.draw.rect(display.display, self.fill, pygame.Rect(*display.cvtRect(self.x, self.y, self.w, self.h)))
+        display.draw_rect(self.fill, self.x, self.y, self.w, self.h)
 
 
 class Block(GameElement):
+
+    __slots__ = ("alive", "bad", "worth", "fall_points")
+    kind = "block"
+    interacts_with = ("player", "blue_bullet", "red_bullet")
+
     def __init__(self, x, y, w, h, **kwargs):
         super().__init__(x, y, w, h, **kwargs)
         self.alive = True
@@ -351,6 +386,15 @@ class Block(GameElement):
         self.worth = worth
         self.fall_points = fall_points
 
+    # destroyed blocks only come back when they wrap around the screen
+    def retired(self):
+        return not self.alive and not (self.vx or self.vy)
+
+    # whether subtick will move the block to the other side of the screen
+    def wraps(self):
+        return ((self.vx > 0.0 and self.x > 1.0) or (self.vx < 0.0 and self.x < -self.w) 
+            or (self.vy > 0.0 and self.y > 1.0))
+
     def subtick(self, game_elements):
 
         if self.vx > 0.0 and self.x > 1.0:
@@ -399,18 +443,23 @@ class Block(GameElement):
         if self.alive:
             if self.bad:
                 w = 3
-                pygame.draw.rect(display.display, self.stroke, 
-                    pygame.Rect(*display.cvtRect(self.x, self.y, self.w, self.h)), w)
-                pygame.draw.line(display.display, self.stroke, 
-                    display.cvtPoint(self.x, self.y), display.cvtPoint(self.x+self.w, self.y+self.h), w)
-                pygame.draw.line(display.display, self.stroke, 
-                    display.cvtPoint(self.x+self.w, self.y), display.cvtPoint(self.x, self.y+self.h), w)
+                display.draw_rect(self.stroke, self.x, self.y, self.w, self.h, w)
+                display.draw_line(self.stroke, self.x, self.y, self.x+self.w, self.y+self.h, w)
+                display.draw_line(self.stroke, self.x+self.w, self.y, self.x, self.y+self.h, w)
             else:
                 super().draw(display)
 
+    def draw_bounds(self):
+        if not self.alive: return None
+        return super().draw_bounds()
+
 
 class BlueBullet(GameElement):
     
+    __slots__ = ()
+    kind = "blue_bullet"
+    interacts_with = ("wall",)
+
     def __init__(self, color):
         super().__init__(-0.5,0.5,0.02,0.04, fill=color, stroke=color)
         self.active = False
@@ -426,12 +475,15 @@ class BlueBullet(GameElement):
         self.y = cy - self.h*0.5
 
     def subtick(self, game_elements):
+        if not self.active:
+            return 0.0
+
         if self.y < -self.h:
             self.active = False
 
         for e in game_elements:
             if isinstance(e, Wall):
-                if self.check_collision(e):
+                if self.check_collision(e, swept=True):
                     self.active = False
 
         return 0.0
@@ -440,6 +492,10 @@ class BlueBullet(GameElement):
 
 class RedBullet(GameElement):
     
+    __slots__ = ()
+    kind = "red_bullet"
+    interacts_with = ("wall",)
+
     def __init__(self, color):
         super().__init__(-0.5,0.5,0.02,0.04, fill=color, stroke=color)
         self.active = False
@@ -455,12 +511,15 @@ class RedBullet(GameElement):
         self.y = cy - self.h*0.5
 
     def subtick(self, game_elements):
+        if not self.active:
+            return 0.0
+
         if self.y > 1.0:
             self.active = False
 
         for e in game_elements:
             if isinstance(e, Wall):
-                if self.check_collision(e):
+                if self.check_collision(e, swept=True):
                     self.active = False
 
         return 0.0
\ No newline at end of file
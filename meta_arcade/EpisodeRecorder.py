@@ -0,0 +1,149 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import atexit
+import queue
+import threading
+import numpy as np
+import imageio
+from meta_arcade.image_settings import shift_colors
+
+# records episodes to a gif (or any other format supported by imageio, e.g. mp4 with
+# imageio-ffmpeg installed) on a background thread.
+# frames are streamed to the encoder as they are drawn instead of being kept until the end
+# of the episode, and at most max_queued_frames frames wait to be encoded at any time.
+# the image settings are applied to the recorded frames on the background thread as well.
+
+# path can contain "{episode}", which is replaced by the episode number.
+# only every record_every-th episode is recorded.
+
+class EpisodeRecorder():
+
+    def __init__(self, path, record_every=1, duration=0.01, max_queued_frames=64):
+
+        if record_every < 1:
+            raise ValueError("record_every must be at least 1")
+
+        self.path = path
+        self.record_every = record_every
+        self.duration = duration
+
+        self.episode = -1
+        self.recording = False
+
+        self.queue = queue.Queue(maxsize=max_queued_frames)
+        self.thread = None
+        self.error = None
+
+        # the last episode is written at exit if the recorder was not closed
+        atexit.register(self.close)
+
+
+    # start the next episode with its image settings. colors_applied is True if the
+    # frames will already have the color shifts and inversion applied
+    def start_episode(self, rotation=0, hsv_shift=(0.0, 0.0, 0.0), invert=False, colors_applied=False):
+        self.end_episode()
+        self.check_error()
+
+        self.episode += 1
+        self.recording = self.episode % self.record_every == 0
+        if not self.recording:
+            return
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.encode, daemon=True)
+            self.thread.start()
+
+        path = self.path.replace("{episode}", str(self.episode))
+        settings = (rotation, np.array(hsv_shift, dtype=np.float32), invert, not colors_applied)
+        self.queue.put(("start", path, settings))
+
+
+    # queue a full resolution RGB frame, which must not be modified afterwards
+    def add_frame(self, frame):
+        if self.recording:
+            self.queue.put(("frame", frame))
+
+
+    def end_episode(self):
+        if self.recording:
+            self.queue.put(("end",))
+            self.recording = False
+
+
+    # finish the current episode and wait for everything to be written
+    def close(self):
+        self.end_episode()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.check_error()
+
+
+    # ======================================================================
+    # Background thread ====================================================
+
+    def encode(self):
+
+        writer = None
+        hsv, hsv_float = None, None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            try:
+                if item[0] == "start":
+                    _, path, (rotation, hsv_shift, invert, shift) = item
+                    if path.lower().endswith(".gif"):
+                        writer = imageio.get_writer(path, mode="I", duration=self.duration)
+                    else:
+                        writer = imageio.get_writer(path, fps=1.0/self.duration)
+
+                elif item[0] == "frame" and writer is not None:
+                    ra = item[1]
+                    if shift:
+                        if hsv is None or hsv.shape != ra.shape:
+                            hsv, hsv_float = np.empty_like(ra), np.empty(ra.shape, dtype=np.float32)
+                        ra = shift_colors(ra, ra, hsv_shift, invert, hsv, hsv_float)
+                    if rotation!=0:
+                        ra = np.rot90(ra, rotation)
+                    writer.append_data(ra)
+
+                elif item[0] == "end" and writer is not None:
+                    writer.close()
+                    writer = None
+
+            # keep emptying the queue so that the game is not blocked,
+            # the error is raised on the main thread
+            except Exception as e:
+                self.error = e
+                writer = None
+
+        if writer is not None:
+            writer.close()
+
+
+    def check_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("episode recording failed") from error
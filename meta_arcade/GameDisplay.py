@@ -22,28 +22,37 @@ IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import numpy as np
 import cv2
 import pygame
-import imageio
-import copy
+from meta_arcade.BaseDisplay import BaseDisplay
 from meta_arcade.Elements import Wall
 
-# this class handles rendering to the screen and creation of the gym image state
+# this class handles rendering with pygame (see BaseDisplay for creation of the gym image state).
+# each display draws onto its own offscreen surface, so multiple environments can share a process.
+# only when not headless is the surface copied to the (process wide) pygame window
 
-class GameDisplay():
+class GameDisplay(BaseDisplay):
 
-    def __init__(self, headless=False, w=250, h=250, episode_as_gif_path=None):
+    def __init__(self, headless=False, w=250, h=250, episode_as_gif_path=None, obs_size=84, record_every=1):
 
-        pygame.display.init()
-        self.w, self.h = w, h
-        self.display_size = [w,h]
+        super().__init__(w, h, episode_as_gif_path, obs_size, record_every)
 
-        self.display = pygame.display.set_mode((int(self.display_size[0]),int(self.display_size[1])), 0, 32)
-        self.episode_as_gif_path = episode_as_gif_path
-        self.highres_frame_buffer = []
+        self.headless = headless
+        # the surface draws directly into a numpy array, which is read without copying
+        self.frame = np.zeros((h, w, 4), dtype=np.uint8)
+        self.surface = pygame.image.frombuffer(self.frame, (w, h), "RGBX")
+
+        self.window = None
+        if not headless:
+            pygame.display.init()
+            self.window = pygame.display.set_mode((int(self.display_size[0]),int(self.display_size[1])), 0, 32)
 
         #load the wall mask teture
         self.wall_texture_surf = pygame.surface.Surface((w, h), pygame.SRCALPHA)
         self.wall_texture_surf_masked = pygame.surface.Surface((w, h), pygame.SRCALPHA)
 
+        # static layer, and the parts of it covering the moving elements
+        self.static_surf = pygame.surface.Surface((w, h))
+        self.static_cover_surf = pygame.surface.Surface((w, h), pygame.SRCALPHA)
+
     def compute_wall_mask(self, game_elements, stripe_clr):
 
         # fill wall surf with transparency
@@ -55,7 +64,7 @@ class GameDisplay():
         for i in range(s):
             p1 = [0,int((i/(s-1))*self.h*2)]
             p2 = [int((i/(s-1))*self.h*2), 0]
-            pygame.draw.line(self.wall_texture_surf, stripe_clr+[255], p1, p2, 6)
+            pygame.draw.line(self.wall_texture_surf, stripe_clr+[255], p1, p2, self.stroke(6))
 
         # draw the walls
         for g in game_elements:
@@ -64,116 +73,55 @@ class GameDisplay():
                 self.wall_texture_surf_masked.blit(self.wall_texture_surf, rect, area=rect)
 
 
-    def prepare_render(self, bg_color):
-        pygame.draw.rect(self.display, bg_color, pygame.Rect(0.0, 0.0, self.display_size[0], self.display_size[1]))
-
-
-    def complete_render(self, score, actions_config, ui1, ui2, ui3):
-
-        #display the wall texture mask
-        self.display.blit(self.wall_texture_surf_masked, (0,0))
-
-        #display game progress
-        pygame.draw.rect(self.display, ui1, 
-            pygame.Rect(0.0, 0.0, self.display_size[0], self.display_size[1]*0.07))
-
-        y = self.display_size[1]*0.02
-        h = self.display_size[1]*0.03
-        w = int(self.display_size[0]*abs(score)/100.0)*0.98
-
-        pygame.draw.rect(self.display, ui3, pygame.Rect(*self.cvtRect(0.01,0.02,0.98,0.03)))
-
-        if score>2.0:
-            x = 0.01
-            pygame.draw.rect(self.display, ui2, pygame.Rect(x, y, w, h))
-
-
-        # display available actions
-        pygame.draw.rect(self.display, ui1, 
-            pygame.Rect(0.0, self.display_size[1]*0.93, self.display_size[0], self.display_size[1]*0.08))
-
-        for i,a in enumerate(["up", "down", "left", "right", "fire"]):
-
-            x = self.display_size[0]*((float(i)/5.0)+0.02)
-            y = self.display_size[1]*0.95
-            w = self.display_size[0]*(0.2 - 0.02*2)
-            h = self.display_size[1]*0.03
-
-            if actions_config[a]:
-                pygame.draw.rect(self.display, ui2, pygame.Rect(x, y, w, h))
-            pygame.draw.rect(self.display, ui3, pygame.Rect(x, y, w, h), 2)
-
-
-
-        pygame.display.update()
-
-
-    def image_state(self, invert=False, rotation=0, hshift=0.0, sshift=0.0, vshift=0.0):
-
-        # get pixels and resize
-        ra = pygame.surfarray.array3d(pygame.display.get_surface())
-        ra = np.transpose(ra, (1,0,2))
-        ra = np.flip(ra, axis=2)
+    def draw_wall_texture(self):
+        self.surface.blit(self.wall_texture_surf_masked, (0,0))
 
-        # resize here for efficiency of not saving high res imagery
-        if self.episode_as_gif_path is None:
-            ra = cv2.resize(ra, (84,84))
 
-        # get normalized hsv
-        image = ra
-        hsv_image = cv2.cvtColor(image,cv2.COLOR_BGR2HSV) #hsv image with values [0-179, 0-255, 0-255]
-        h, s, v = hsv_image[:,:,0], hsv_image[:,:,1], hsv_image[:,:,2]
-        h = h.astype(np.float32) / 179.0
-        s = s.astype(np.float32) / 255.0
-        v = v.astype(np.float32) / 255.0
+    def store_static_layer(self, cover):
+        self.static_surf.blit(self.surface, (0,0))
 
-        # apply hsv shifts
-        h = np.mod(h + hshift, 1.0)
-        s = np.clip(s + sshift, 0.0, 1.0)
-        v = np.clip(v + vshift, 0.0, 1.0)
+        self.static_cover_surf.fill([0,0,0,0])
+        self.static_cover_surf.blit(self.wall_texture_surf_masked, (0,0))
+        for x0, y0, x1, y1 in cover:
+            rect = pygame.Rect(x0, y0, x1-x0, y1-y0)
+            self.static_cover_surf.blit(self.static_surf, rect, area=rect)
 
-        #convert back to [0-255] rgb
-        hsv_image = np.asarray([h*179.0,s*255.0,v*255.0])
-        hsv_image = np.transpose(hsv_image, (1,2,0))
-        ra = cv2.cvtColor(hsv_image.astype(np.uint8), cv2.COLOR_HSV2RGB)
-        ra = ra.astype(np.float32)
+    def restore_static_layer(self):
+        self.surface.blit(self.static_surf, (0,0))
 
-        if invert:
-            ra = 255.0 - ra
+    def restore_static_region(self, x0, y0, x1, y1):
+        rect = pygame.Rect(x0, y0, x1-x0, y1-y0)
+        self.surface.blit(self.static_surf, rect, area=rect)
 
-        if rotation!=0:
-            ra = np.rot90(ra, rotation)
+    def restore_static_cover(self, bounds=None):
+        if bounds is None:
+            self.surface.blit(self.static_cover_surf, (0,0))
+        else:
+            x0, y0, x1, y1 = bounds
+            rect = pygame.Rect(x0, y0, x1-x0, y1-y0)
+            self.surface.blit(self.static_cover_surf, rect, area=rect)
 
-        ra = ra.astype(np.uint8)
 
-        # save and resize
-        if self.episode_as_gif_path is not None:
-            self.highres_frame_buffer.append(copy.deepcopy(ra))
-            ra = cv2.resize(ra, (84,84))
+    def pixel_rect(self, color, x, y, w, h, width=0):
+        pygame.draw.rect(self.surface, color, pygame.Rect(x, y, w, h), width)
 
-        return ra
+    def pixel_circle(self, color, center, r, width=0):
+        pygame.draw.circle(self.surface, color, center, r, width)
 
+    def pixel_line(self, color, p1, p2, width=1):
+        pygame.draw.line(self.surface, color, p1, p2, width)
 
-    def cvtX(self, x):
-        return int(x*self.display_size[0])
 
-    def cvtY(self, y):
-        return int(y*self.display_size[1])
+    def present(self):
+        if self.window is not None:
+            self.window.blit(self.surface, (0,0))
+            pygame.display.update()
 
-    def cvtPoint(self, x, y):
-        return (self.cvtX(x), self.cvtY(y))
 
-    def cvtRect(self, x, y, w, h):
-        x = int(x*self.display_size[0])
-        y = int(y*self.display_size[1])
-        w = int(w*self.display_size[0])
-        h = int(h*self.display_size[1])
-        w = max(w,1) #make sure size is at least 1 pixel
-        h = max(h,1) #make sure size is at least 1 pixel
-        return x, y, w, h
+    def get_pixels(self):
+        return cv2.cvtColor(self.frame, cv2.COLOR_RGBA2RGB, dst=self.buffer("pixels", (self.h, self.w, 3)))
 
-    # save the frames of this episode to a gif and clear buffer
-    def buffer_to_gif(self):
-        if self.episode_as_gif_path is not None:
-            imageio.mimsave(self.episode_as_gif_path, self.highres_frame_buffer, duration=0.01)
-            self.highres_frame_buffer = []
\ No newline at end of file
+    # resize before dropping the unused fourth channel, so only the small image is converted
+    def get_resized_pixels(self, dst):
+        ra = self.resize(self.frame, self.buffer("resized_rgbx", dst.shape[:2] + (4,)))
+        return cv2.cvtColor(ra, cv2.COLOR_RGBA2RGB, dst=dst)
@@ -19,13 +19,30 @@ WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR
 IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import pygame
+import math
 import random
 
 # rectangluar game element with bounding box, position, velocity
 
 class GameElement():
 
+    # elements are slotted to keep the hundreds preallocated per game small,
+    # subclasses list the attributes they add
+    __slots__ = ("x", "y", "w", "h", "ox", "oy", "vx", "vy", "fill", "stroke", "active",
+        "collision_adjust", "show_bbox", "_prng")
+
+    # static elements never move or change during an episode,
+    # so the display only needs to draw them once per reset
+    static = False
+
+    # kind of element and the kinds of elements its subtick responds to,
+    # subtick is only given elements of these kinds
+    kind = "element"
+    interacts_with = ()
+
+    # kinds of elements it responds to regardless of distance
+    tracks = ()
+
     def __init__(self, x=0, y=0, w=0, h=0, vx=0.0, vy=0.0, 
         fill=[255,255,255], stroke=[255,255,255], centered=False, 
         size_protection=True, prng=None):
@@ -56,10 +73,19 @@ class GameElement():
         self.collision_adjust = 0.0
         self.show_bbox = False
 
-        if prng is None:
-            self.prng = random.Random()
-        else:
-            self.prng = prng
+        self.prng = prng
+
+    # elements making random choices are given the game's prng, the others
+    # only create their own if they ever need one
+    @property
+    def prng(self):
+        if self._prng is None:
+            self._prng = random.Random()
+        return self._prng
+
+    @prng.setter
+    def prng(self, prng):
+        self._prng = prng
 
     # updates this object's velocity and then returns any changes to reward
     # game over will be determined from this, i.e. -100 pts implies game over
@@ -81,16 +107,22 @@ class GameElement():
         self.draw(display)
 
         if self.show_bbox:
-            pygame.draw.rect(display.display, [255,0,0], pygame.Rect(*display.cvtRect(self.x+self.collision_adjust, 
+            display.draw_rect([255,0,0], self.x+self.collision_adjust, 
                 self.y+self.collision_adjust, 
                 self.w-self.collision_adjust-self.collision_adjust, 
-                self.h-self.collision_adjust-self.collision_adjust)), 2)
+                self.h-self.collision_adjust-self.collision_adjust, 2)
 
     def draw(self, display):
-        pygame.draw.rect(display.display, self.fill, pygame.Rect(*display.cvtRect(self.x, self.y, self.w, self.h)))
+        display.draw_rect(self.fill, self.x, self.y, self.w, self.h)
         
         # there's some sort of incompatability here for pygame 1 vs 2
-        # pygame.draw.rect(display.display, self.stroke, pygame.Rect(*display.cvtRect(self.x, self.y, self.w, self.h)), 2)
+        # display.draw_rect(self.stroke, self.x, self.y, self.w, self.h, 2)
+
+
+    # area covered by draw() as x, y, w, h, or None if nothing is drawn
+    def draw_bounds(self):
+        if not self.active: return None
+        return self.x, self.y, self.w, self.h
 
 
     def reset(self):
@@ -104,36 +136,111 @@ class GameElement():
         self.active = False
 
 
-    def check_collision(self, other, propogate_x=False, propogate_y=False):
+    # whether subtick and tick do nothing for the rest of the episode,
+    # so the element no longer needs to be stepped
+    def retired(self):
+        return self.static
+
+
+    # with swept, a fast element passing through other within the tick also collides with it
+    def check_collision(self, other, propogate_x=False, propogate_y=False, swept=False):
 
         if not (self.active and other.active): return False
 
-        l1 = [self.x + self.collision_adjust, self.y + self.collision_adjust]
-        r1 = [self.x + self.w - self.collision_adjust, self.y + self.h - self.collision_adjust]
-        l2 = [other.x + other.collision_adjust, other.y + other.collision_adjust]
-        r2 = [other.x + other.w - other.collision_adjust, other.y + other.h - other.collision_adjust]
+        a1 = self.collision_adjust
+        a2 = other.collision_adjust
+
+        l1x = self.x + a1
+        l1y = self.y + a1
+        r1x = self.x + self.w - a1
+        r1y = self.y + self.h - a1
+        l2x = other.x + a2
+        l2y = other.y + a2
+        r2x = other.x + other.w - a2
+        r2y = other.y + other.h - a2
 
         if propogate_x:
-            l1[0] += self.vx
-            r1[0] += self.vx
+            l1x += self.vx
+            r1x += self.vx
 
         if propogate_y:
-            l1[1] += self.vy
-            r1[1] += self.vy
+            l1y += self.vy
+            r1y += self.vy
 
         # project the other object forward in time
         if propogate_x or propogate_y:
-            l2[0] += other.vx
-            l2[1] += other.vy
-            r2[0] += other.vx
-            r2[1] += other.vy
+            l2x += other.vx
+            l2y += other.vy
+            r2x += other.vx
+            r2y += other.vy
 
         # If one rectangle is on left side of other 
-        if(l1[0] >= r2[0] or l2[0] >= r1[0]): 
-            return False
+        if(l1x >= r2x or l2x >= r1x): 
+            return swept and self.passes_through(other, propogate_x, propogate_y)
       
         # If one rectangle is above other 
-        if(l1[1] >= r2[1] or l2[1] >= r1[1]): 
+        if(l1y >= r2y or l2y >= r1y): 
+            return swept and self.passes_through(other, propogate_x, propogate_y)
+
+        return True
+
+
+    # whether this element passes through other during the tick without overlapping it
+    # before or after, which the projected check misses (swept bounding boxes).
+    # the element moves along the projected axes, or along both if none are projected
+    def passes_through(self, other, propogate_x=False, propogate_y=False):
+
+        if not (propogate_x or propogate_y):
+            propogate_x = propogate_y = True
+
+        a1 = self.collision_adjust
+        a2 = other.collision_adjust
+
+        # motion relative to the other object
+        dx = (self.vx if propogate_x else 0.0) - other.vx
+        dy = (self.vy if propogate_y else 0.0) - other.vy
+
+        # only an element moving further than both sizes in a tick can pass through
+        if (abs(dx) <= self.w + other.w - 2*(a1 + a2) and 
+            abs(dy) <= self.h + other.h - 2*(a1 + a2)):
             return False
 
-        return True
\ No newline at end of file
+        enter_x, leave_x = overlap_times(self.x + a1, self.x + self.w - a1, 
+            other.x + a2, other.x + other.w - a2, dx)
+        enter_y, leave_y = overlap_times(self.y + a1, self.y + self.h - a1, 
+            other.y + a2, other.y + other.h - a2, dy)
+
+        enter = max(enter_x, enter_y)
+        leave = min(leave_x, leave_y)
+        return 0.0 < enter < leave < 1.0
+
+
+
+# times between which the intervals l1-r1 moving by d per tick and l2-r2 overlap
+def overlap_times(l1, r1, l2, r2, d):
+    if d > 0.0:
+        return (l2 - r1) / d, (r2 - l1) / d
+    if d < 0.0:
+        return (r2 - l1) / d, (l2 - r1) / d
+    if l1 < r2 and l2 < r1:
+        return -math.inf, math.inf
+    return math.inf, -math.inf
+
+
+
+# game elements of each kind, in game_elements order
+def group_by_kind(game_elements):
+    elements_by_kind = {}
+    for e in game_elements:
+        elements_by_kind.setdefault(e.kind, []).append(e)
+    return elements_by_kind
+
+
+# for each kind of element, the elements its subtick responds to, in game_elements order
+def interaction_lists(game_elements, elements_by_kind):
+    order = {e: i for i, e in enumerate(game_elements)}
+    lists = {}
+    for kind, elements in elements_by_kind.items():
+        partners = [o for k in elements[0].interacts_with for o in elements_by_kind.get(k, [])]
+        lists[kind] = sorted(partners, key=order.get)
+    return lists
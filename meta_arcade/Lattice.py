@@ -0,0 +1,76 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import math
+
+# blocks or barriers placed by MetaArcade.reset on a regular grid of rows and columns,
+# so that the elements near a point can be found from the few cells around it.
+# in moving rows (weaving blocks) the elements keep their row, but not their column
+
+class Lattice():
+
+    def __init__(self, x, y, cell_w, cell_h, rows, cols, moving_rows=False):
+        self.x, self.y = x, y
+        self.cell_w, self.cell_h = cell_w, cell_h
+        self.rows, self.cols = rows, cols
+        self.moving_rows = moving_rows
+
+        self.cells = {}
+        self.row_elements = [[] for j in range(rows)]
+        self.elements = []
+
+        # how far elements extend beyond their cell (with negative spacing),
+        # and how far they move in a tick
+        self.overhang = 0.0
+        self.speed = 0.0
+
+
+    def add(self, i, j, e):
+        self.cells[i, j] = e
+        self.row_elements[j].append(e)
+        self.elements.append(e)
+
+        cx = self.x + self.cell_w*i
+        cy = self.y + self.cell_h*j
+        self.overhang = max(self.overhang, cx - e.x, cy - e.y, 
+            e.x + e.w - (cx + self.cell_w), e.y + e.h - (cy + self.cell_h))
+        self.speed = max(self.speed, abs(e.vx) + abs(e.vy))
+
+
+    # appends the elements in the cells overlapping l, r, t, b (widened by margin) to out
+    def query(self, l, r, t, b, out, margin=0.0):
+        m = self.overhang + self.speed + margin
+
+        j0 = max(math.floor((t - m - self.y) / self.cell_h), 0)
+        j1 = min(math.floor((b + m - self.y) / self.cell_h), self.rows - 1)
+        if self.moving_rows:
+            for j in range(j0, j1+1):
+                out.extend(self.row_elements[j])
+            return
+
+        i0 = max(math.floor((l - m - self.x) / self.cell_w), 0)
+        i1 = min(math.floor((r + m - self.x) / self.cell_w), self.cols - 1)
+        cells = self.cells
+        for j in range(j0, j1+1):
+            for i in range(i0, i1+1):
+                e = cells.get((i, j))
+                if e is not None:
+                    out.append(e)
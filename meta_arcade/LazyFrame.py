@@ -0,0 +1,66 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+
+# observation which is only drawn when it is first used as an array, e.g. with np.asarray(obs).
+# frames that are never used (skipped frames, reward-only evaluation) then cost nothing to render.
+# the frame shows the game when it was returned, so it must be used before the environment
+# steps again (convert it with np.asarray to keep it for longer)
+
+class LazyFrame():
+
+    def __init__(self, env, out=None):
+        self.env = env
+        self.frame_count = env.frame_count
+        self.out = out
+        self.frame = None
+
+    @property
+    def shape(self):
+        return (self.env.observation_size, self.env.observation_size, 3)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.uint8)
+
+    # draw the frame if it has not been drawn yet
+    def get(self):
+        if self.frame is None:
+            if self.env.frame_count != self.frame_count:
+                raise RuntimeError("LazyFrame was used after the environment advanced; "
+                    "convert observations with np.asarray before the next step to keep them")
+            self.frame = self.env.draw(self.out)
+        return self.frame
+
+    def __array__(self, dtype=None, copy=None):
+        frame = self.get()
+        if dtype is not None and np.dtype(dtype) != frame.dtype:
+            return frame.astype(dtype)
+        if copy:
+            return frame.copy()
+        return frame
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def __len__(self):
+        return self.shape[0]
@@ -20,12 +20,19 @@ IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
 import gym
+import importlib.util
 import numpy as np
 import cv2
-import os
 
 from meta_arcade.Elements import *
-from meta_arcade.Config import MAConfig
+from meta_arcade.GameElement import group_by_kind
+from meta_arcade.Config import MAConfig, ConfigSnapshot, InterpolationPlan
+from meta_arcade.LazyFrame import LazyFrame
+from meta_arcade.ArrayPhysics import ArrayPhysics
+from meta_arcade.BroadPhase import BroadPhase
+from meta_arcade.Lattice import Lattice
+from meta_arcade.StaticGrid import StaticGrid
+from meta_arcade.actions import action_routine
 
 import json
 
@@ -33,7 +40,8 @@ import json
 class MetaArcade(gym.Env):
 
     def __init__(self, config=None, headless=False, episode_as_gif_path=None, game_ticks_per_step=2,
-        continuous=False, **kwargs):
+        continuous=False, render_backend="pygame", observation_size=84, native_resolution=False, 
+        lazy_observations=False, record_every=1, physics="elements", **kwargs):
 
         if isinstance(config, MAConfig):
             pass
@@ -41,17 +49,46 @@ class MetaArcade(gym.Env):
             config = MAConfig(config)
 
         self.config = config
+
+        # episodes are recorded in the background, episode_as_gif_path can contain "{episode}"
+        # to keep a file per episode. only every record_every-th episode is recorded
         self.episode_as_gif_path = episode_as_gif_path
+        self.record_every = record_every
 
         self.headless = headless
         self.has_display = False
+
+        # "pygame" draws with pygame (and shows an SDL window if not headless, needed for human play),
+        # "numpy" rasterizes directly into an array without SDL, which is much faster for headless training
+        if render_backend not in ["pygame", "numpy"]:
+            raise ValueError("render_backend must be 'pygame' or 'numpy'")
+        self.render_backend = render_backend
+
+        # with native_resolution the game is drawn directly at the observation size
+        # (antialiased with the numpy backend) instead of drawing at 250x250 and resizing
+        self.observation_size = observation_size
+        self.native_resolution = native_resolution
+
+        # with lazy_observations, reset and step return a LazyFrame which is only drawn when used
+        self.lazy_observations = lazy_observations
+        self.frame_count = 0
+
+        # "elements" runs the subtick of every game element (the reference implementation),
+        # "array" keeps blocks and walls in numpy arrays and handles all blocks at once,
+        # "compiled" is the array physics with the blocks handled by numba kernels
+        if physics not in ["elements", "array", "compiled"]:
+            raise ValueError("physics must be 'elements', 'array' or 'compiled'")
+        if physics == "compiled" and importlib.util.find_spec("numba") is None:
+            raise ImportError("physics='compiled' requires numba, install it with pip install -e .[numba]")
+        self.physics = physics
         
         self.continuous = continuous
         if not continuous:
             self.action_space = gym.spaces.Discrete(6)
         else:
             self.action_space = gym.spaces.Box(low=-1.0, high=1.0, shape=(3,))
-        self.observation_space = gym.spaces.Box(low=0, high=255, shape=(84, 84, 3), dtype=np.uint8)
+        self.observation_space = gym.spaces.Box(low=0, high=255, shape=(observation_size, observation_size, 3), 
+            dtype=np.uint8)
 
         self.cum_score = 0.0
         self.cum_steps = 0.0
@@ -75,11 +112,18 @@ class MetaArcade(gym.Env):
         if not self.has_display:
             self.has_display = True
 
-            if self.headless:
-                os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            size = self.observation_size if self.native_resolution else 250
+
+            if self.render_backend == "numpy":
+                from meta_arcade.ArrayDisplay import ArrayDisplay
+                self.display = ArrayDisplay(w=size, h=size, episode_as_gif_path=self.episode_as_gif_path,
+                    obs_size=self.observation_size, antialias=self.native_resolution, record_every=self.record_every)
+                return
 
             from meta_arcade.GameDisplay import GameDisplay
-            self.display = GameDisplay(headless=self.headless, episode_as_gif_path=self.episode_as_gif_path)
+            self.display = GameDisplay(headless=self.headless, w=size, h=size, 
+                episode_as_gif_path=self.episode_as_gif_path, obs_size=self.observation_size, 
+                record_every=self.record_every)
 
 
     @property
@@ -91,17 +135,24 @@ class MetaArcade(gym.Env):
         np.random.seed(s)
         self.prng.seed(s)
 
-    def reset(self):
+    # out: optional (observation_size, observation_size, 3) uint8 array to write the state into
+    def reset(self, out=None, render_obs=True):
 
         # only build display when we actually need it... this way we can pickle the
         # environment if we havent used it yet :)
         self.build_display()
 
-        config = self.config
+        # every parameter is sampled once per episode, and the values the game
+        # reads while it runs are kept in a read only snapshot
+        config = self.config.sample_constant_values()
+        self.settings = ConfigSnapshot(config)
 
         self.game_elements = []
         self.exterior_walls = []
 
+        # grids of blocks and barriers which keep their cells (or rows, for weaving blocks)
+        self.lattices = []
+
         pcfg = config["player_settings"]
         player = Player(pcfg["width"], pcfg["height"], pcfg["speed"], pcfg["color"], 
             config["actions"]["fire"], pcfg["steering"], prng=self.prng)
@@ -142,6 +193,7 @@ class MetaArcade(gym.Env):
                     cfg["skill_level"], cfg["tracks_ball"], cfg["can_shoot"], prng=self.prng))
             self.opponent = self.game_elements[-1]
 
+        self.bbullet = None
         if config["actions"]["fire"]:
             bbullet = BlueBullet(config["player_settings"]["color"])
             self.game_elements.append(bbullet)
@@ -159,11 +211,6 @@ class MetaArcade(gym.Env):
         self.cum_steps = 0.0
         self.cum_score = 0.0
 
-        self.bgclr = self.config["display_settings"]["background_color"]
-        self.uiclr1 = self.config["display_settings"]["ui_color"]
-        self.uiclr2 = self.config["display_settings"]["indicator_color_1"]
-        self.uiclr3 = self.config["display_settings"]["indicator_color_2"]
-
         for b in self.block_pool:
             b.reset()
         for w in self.barrier_pool:
@@ -174,12 +221,12 @@ class MetaArcade(gym.Env):
         #synchronize multi-ball velocity
         if config["game_elements"]["ball"]:
             for e in self.game_elements:
-                if isinstance(e, Ball):
+                if e.kind == "ball":
                     e.vx, e.vy = self.ball.vx, self.ball.vy
 
         #pull in the blocks we need
-        bcfg = self.config["blocks_settings"].sample_constant_values()
-        if self.config["game_elements"]["blocks"]:
+        bcfg = config["blocks_settings"]
+        if config["game_elements"]["blocks"]:
             x, y, w, h = bcfg["creation_area"]
             r, c = bcfg["rows"], bcfg["cols"]
             block_nom_width = w / c
@@ -189,7 +236,14 @@ class MetaArcade(gym.Env):
             block_true_height = block_nom_height * (1.0 - bcfg["spacing"])
             paddy = (block_nom_height-block_true_height)*0.5
 
+            lattice = None
+            if bcfg["static_weave_fall"] != "fall" and block_nom_width > 0.0 and block_nom_height > 0.0:
+                lattice = Lattice(x, y, block_nom_width, block_nom_height, r, c, 
+                    moving_rows=bcfg["static_weave_fall"] == "weave")
+                self.lattices.append(lattice)
+
             count = 0
+            blocks = []
             block_locations = []
             for j in range(r):
 
@@ -245,7 +299,12 @@ class MetaArcade(gym.Env):
                 fallpts = -100.0 if "fall_points" not in bcfg else bcfg["fall_points"]
                 block.configure(bx, by, block_true_width, block_true_height, vx=bvx, vy=bvy, worth=bcfg["points"],
                     bad=bad, fall_points=fallpts, color=bcfg["color"])
-                self.game_elements.insert(0, block)
+                blocks.append(block)
+                if lattice is not None:
+                    lattice.add(i, j, block)
+
+            # blocks come first, the last one placed at the front
+            self.game_elements[:0] = blocks[::-1]
 
             if bcfg["points"]=="divide":
                 worth = (100.0 / float(count)) + 0.001
@@ -254,8 +313,8 @@ class MetaArcade(gym.Env):
 
 
         #pull in the walls we need
-        bcfg = self.config["static_barrier_settings"].sample_constant_values()
-        if self.config["game_elements"]["static_barriers"]:
+        bcfg = config["static_barrier_settings"]
+        if config["game_elements"]["static_barriers"]:
             x, y, w, h = bcfg["creation_area"]
             r, c = bcfg["rows"], bcfg["cols"]
             block_nom_width = w / c
@@ -265,6 +324,11 @@ class MetaArcade(gym.Env):
             block_true_height = block_nom_height * (1.0 - bcfg["spacing"])
             paddy = (block_nom_height-block_true_height)*0.5
 
+            lattice = None
+            if block_nom_width > 0.0 and block_nom_height > 0.0:
+                lattice = Lattice(x, y, block_nom_width, block_nom_height, r, c)
+                self.lattices.append(lattice)
+
             count = 0
             block_locations = []
             for j in range(r):
@@ -313,68 +377,103 @@ class MetaArcade(gym.Env):
                 count += 1
                 barrier.configure(bx, by, block_true_width, block_true_height, color=bcfg["color"])
                 self.game_elements.append(barrier)
+                if lattice is not None:
+                    lattice.add(i, j, barrier)
 
 
-        # image settings
-        self.img_invert = False
-        self.img_rot = 0
-        self.img_hue_shift = 0.0
-        self.img_sat_shift = 0.0
-        self.img_val_shift = 0.0
-        if "image_settings" in self.config:
-            icfg = self.config["image_settings"]
-            if "color_inversion" in icfg:   self.img_invert = icfg["color_inversion"]
-            if "rotation" in icfg:          self.img_rot = icfg["rotation"]
-            if "hue_shift" in icfg:         self.img_hue_shift = icfg["hue_shift"]
-            if "saturation_shift" in icfg:  self.img_sat_shift = icfg["saturation_shift"]
-            if "value_shift" in icfg:       self.img_val_shift = icfg["value_shift"]
+        # elements are grouped by kind once, so that each subtick is only given
+        # the kinds of elements it interacts with
+        self.elements_by_kind = group_by_kind(self.game_elements)
 
-        self.display.compute_wall_mask(self.game_elements, self.bgclr)
-        return self.draw()
+        # walls and barriers never move, so they are found from a grid built once
+        self.static_grid = StaticGrid(self.game_elements)
+        if self.physics != "elements":
+            self.array_physics = ArrayPhysics(self.game_elements, self.static_grid, 
+                compiled=self.physics == "compiled")
+        else:
+            self.broad_phase = BroadPhase(self.game_elements, self.elements_by_kind, self.static_grid, 
+                self.lattices)
 
+        # elements whose subtick and tick still do something, in game_elements order
+        self.active_elements = [e for e in self.game_elements if not e.retired()]
 
-    def step(self, action):
+        # step is specialized to the game: actions the game does not allow are
+        # dropped from the action routine
+        settings = self.settings
+        self.apply_action = action_routine(self.continuous, settings.up, settings.down, 
+            settings.left, settings.right, settings.fire)
+        self.run_ticks = self.run_elements if self.physics == "elements" else self.array_physics.run
 
-        # apply actions to the paddle (the only thing we can control)
-        if not self.continuous:
-            if action==1 and self.config["actions"]["up"]:
-                self.player.vy = -self.player.speed
-            elif action==2 and self.config["actions"]["down"]:
-                self.player.vy = self.player.speed
-            elif action==3 and self.config["actions"]["left"]:
-                self.player.vx = -self.player.speed
-            elif action==4 and self.config["actions"]["right"]:
-                self.player.vx = self.player.speed
-            elif action==5 and self.config["actions"]["fire"]:
-                if not self.bbullet.active:
-                    self.bbullet.activate(self.player.x+(self.player.w*0.5), self.player.y)
-        else:
-            if action[2] <= 0.0:
-                if self.config["actions"]["up"] or self.config["actions"]["down"]:
-                    self.player.vy = self.player.speed*action[0]
+        self.display.set_image_settings(settings.color_inversion, settings.rotation, settings.hue_shift, 
+            settings.saturation_shift, settings.value_shift)
+        self.display.start_episode()
+        self.display.compute_wall_mask(self.game_elements, settings.background_color)
+
+        # static elements are drawn once into the display's static layer. each frame only
+        # draws the elements from the first to the last moving one, and static elements
+        # in between are restored from the static layer to keep the drawing order
+        moving = [i for i,e in enumerate(self.game_elements) if not e.static]
+        first, last = moving[0], moving[-1]
+        self.draw_elements = self.game_elements[first:last+1]
+        cover_walls = [e for e in self.game_elements[last+1:] if e.static]
+        self.display.compute_static_layer(self.game_elements, cover_walls, settings.background_color, 
+            config["actions"], settings.ui_color, settings.indicator_color_1, settings.indicator_color_2)
 
-                if self.config["actions"]["left"] or self.config["actions"]["right"]:
-                    self.player.vx = self.player.speed*action[1]
-            else:
-                self.player.vx = 0.0
-                self.player.vy = 0.0
+        return self.observe(render_obs, out)
 
-            if self.config["actions"]["fire"]:
-                if not self.bbullet.active and action[2]>0.0:
-                    self.bbullet.activate(self.player.x+(self.player.w*0.5), self.player.y)
+
+    # out: optional (observation_size, observation_size, 3) uint8 array to write the state into
+    # render_obs: if False, the state is not drawn and None is returned in its place
+    def step(self, action, out=None, render_obs=True):
+
+        # apply actions to the paddle (the only thing we can control)
+        self.apply_action(self.player, self.bbullet, action)
 
         # step forward calculation
+        dscore, game_over = self.run_ticks(self.game_ticks_per_step)
+
+        # zero out player velocity
+        self.player.vx = 0.0
+        self.player.vy = 0.0
+
+        # check for end of game
+        self.cum_score += dscore
+        done = False
+        self.cum_steps += 1
+
+        if self.cum_steps >= self.settings.max_episode_length:
+            done = True
+        if abs(self.cum_score) >= 100.0:
+            done = True
+        if game_over:
+            done = True
+
+        # draw
+        img = self.observe(render_obs, out)
+
+        # finish the recording of this episode
+        if done:
+            self.display.end_episode()
+
+        return img, dscore, done, {}
+
+
+    # runs the game ticks of one step through the subtick of every active game element,
+    # returns the change in score and whether the game is over.
+    # each element is only given the elements it can interact with by the broad phase
+    def run_elements(self, ticks):
         dscore = 0.0
         game_over = False
-        for rep in range(self.game_ticks_per_step):
+        for rep in range(ticks):
             if game_over:continue
 
             #compute velocities and rewards from interactions
+            self.broad_phase.update()
             for i in range(1):
                 if game_over: continue
-                for e in self.game_elements:
+                for e in self.active_elements:
                     if game_over: continue
-                    edscore = e.subtick(self.game_elements)
+                    edscore = e.subtick(self.broad_phase.candidates(e))
                     if edscore >= 100.0:
                         dscore = 100.0
                         game_over = True
@@ -385,46 +484,40 @@ class MetaArcade(gym.Env):
                         dscore += edscore
 
             # execute the step forward
-            for e in self.game_elements:
+            for e in self.active_elements:
                 e.tick()
 
-        # zero out player velocity
-        self.player.vx = 0.0
-        self.player.vy = 0.0
+        # blocks destroyed this step (which score points) can be left out from now on
+        if dscore:
+            self.active_elements = [e for e in self.active_elements if not e.retired()]
 
-        # check for end of game
-        self.cum_score += dscore
-        done = False
-        self.cum_steps += 1
+        return dscore, game_over
 
-        timeout_steps = 5000.0
-        if "max_episode_length" in self.config["meta"]:
-            timeout_steps = self.config["meta"]["max_episode_length"]
 
-        if self.cum_steps >= timeout_steps:
-            done = True
-        if abs(self.cum_score) >= 100.0:
-            done = True
-        if game_over:
-            done = True
+    def observe(self, render_obs, out):
+        self.frame_count += 1
 
-        # draw
-        img = self.draw()
+        # frames of a recorded episode are always drawn
+        if self.display.recording():
+            img = self.draw(out)
+            return img if render_obs else None
 
-        # save a gif if desired
-        if done:
-            self.display.buffer_to_gif()
+        if not render_obs:
+            return None
+        if self.lazy_observations:
+            return LazyFrame(self, out)
+        return self.draw(out)
 
-        return img, dscore, done, {}
 
+    def draw(self, out=None):
+        self.display.render_frame(self.draw_elements, self.cum_score)
+        return self.display.image_state(out)
 
-    def draw(self):
-        self.display.prepare_render(self.bgclr)
-        for e in self.game_elements:
-            e.render(self.display)
-        self.display.complete_render(self.cum_score, self.config["actions"], self.uiclr1, self.uiclr2, self.uiclr3)
-        return self.display.image_state(self.img_invert, self.img_rot, self.img_hue_shift, 
-            self.img_sat_shift, self.img_val_shift)
+
+    # wait for any episode recording to be written
+    def close(self):
+        if self.has_display:
+            self.display.close()
 
 
     def render(self, mode):
@@ -438,7 +531,6 @@ class MetaArcade(gym.Env):
 class MetaArcadeInterpolate(MetaArcade):
 
     def __init__(self, config1=None, config2=None, duration=1, episodic=False, headless=False):
-        self.config1, self.config2 = config1, config2
 
         if not isinstance(config1, MAConfig):
             config1 = MAConfig(config1)
@@ -446,12 +538,15 @@ class MetaArcadeInterpolate(MetaArcade):
         if not isinstance(config2, MAConfig):
             config2 = MAConfig(config2)
 
+        self.config1, self.config2 = config1, config2
+        self.plan = InterpolationPlan(config1, config2)
+
         self.target_duration = float(duration)
         self.duration = 0.0
         self.episodic = episodic
         super().__init__(config1, headless)
 
-    def reset(self):
+    def reset(self, out=None, render_obs=True):
         if self.episodic:
             self.duration += 1.0
 
@@ -459,13 +554,13 @@ class MetaArcadeInterpolate(MetaArcade):
         if progress > 1.0:
             progress = 1.0
 
-        self.config = self.config1.interpolate_towards(self.config2, progress)
-        return super().reset()
+        self.config = self.plan.at(progress)
+        return super().reset(out, render_obs)
 
-    def step(self, a):
+    def step(self, a, out=None, render_obs=True):
         if not self.episodic:
             self.duration += 1.0
-        return super().step(a)
+        return super().step(a, out, render_obs)
 
         
 
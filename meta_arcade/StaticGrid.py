@@ -0,0 +1,72 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+# coarse occupancy grid of the static elements (walls and barriers), built on reset.
+# each cell of the screen lists the static elements overlapping it, so the ones a moving
+# element can reach are found from the few cells covered by its swept bounding box.
+# the elements found for each kind of element and range of cells are kept, as moving
+# elements only ever cover a small number of ranges
+
+# cells per side of the screen
+CELLS = 16
+
+# with fewer static elements, moving elements are given all of them as this is faster
+MIN_ELEMENTS = 6
+
+
+class StaticGrid():
+
+    def __init__(self, game_elements, cells=CELLS):
+        self.cells = cells
+        self.order = {e: i for i, e in enumerate(game_elements)}
+        self.elements = [e for e in game_elements if e.static]
+
+        self.cell_elements = [[[] for i in range(cells)] for j in range(cells)]
+        for e in self.elements:
+            i0, i1, j0, j1 = self.cell_range(e.x, e.x + e.w, e.y, e.y + e.h)
+            for j in range(j0, j1+1):
+                for i in range(i0, i1+1):
+                    self.cell_elements[j][i].append(e)
+
+        self.found = {}
+        self.enabled = len(self.elements) >= MIN_ELEMENTS
+
+
+    # columns and rows of the cells covered by l, r, t, b, clamped to the screen
+    # (static elements beyond the screen are kept in the border cells)
+    def cell_range(self, l, r, t, b):
+        c = self.cells - 1
+        return (min(max(int(l*self.cells), 0), c), min(max(int(r*self.cells), 0), c), 
+            min(max(int(t*self.cells), 0), c), min(max(int(b*self.cells), 0), c))
+
+
+    # others, which are not static, and the static elements e can reach in a tick,
+    # in game_elements order. others must be the same list for each kind of element
+    def near(self, e, reach, others):
+        key = (e.kind,) + self.cell_range(e.x - reach, e.x + e.w + reach, e.y - reach, e.y + e.h + reach)
+        found = self.found.get(key)
+        if found is None:
+            k, i0, i1, j0, j1 = key
+            static = set(o for j in range(j0, j1+1) for i in range(i0, i1+1) for o in self.cell_elements[j][i]
+                if o.kind in e.interacts_with)
+            found = sorted(others + list(static), key=self.order.get)
+            self.found[key] = found
+        return found
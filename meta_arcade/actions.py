@@ -0,0 +1,83 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+
+# routines applying an action to the player, specialized at reset to the actions
+# the game allows. routines are kept for each combination of allowed actions
+# (the fingerprint), so they are only built once per process
+
+routines = {}
+
+
+# routine applying an action, called as routine(player, bbullet, action).
+# the player velocity is zero before each action is applied
+def action_routine(continuous, up, down, left, right, fire):
+    fingerprint = (continuous, up, down, left, right, fire)
+    if fingerprint not in routines:
+        if continuous:
+            routines[fingerprint] = continuous_routine(up or down, left or right, fire)
+        else:
+            routines[fingerprint] = discrete_routine(up, down, left, right, fire)
+    return routines[fingerprint]
+
+
+# discrete actions 1-4 move the player up, down, left and right, 5 fires
+def discrete_routine(up, down, left, right, fire):
+
+    # velocity of the player for each allowed move, as multiples of its speed
+    moves = {}
+    if up: moves[1] = (0.0, -1.0)
+    if down: moves[2] = (0.0, 1.0)
+    if left: moves[3] = (-1.0, 0.0)
+    if right: moves[4] = (1.0, 0.0)
+
+    def apply(player, bbullet, action):
+        # actions from policies are often numpy or torch scalars, or single element arrays
+        if isinstance(action, np.ndarray):
+            action = action.item()
+        action = int(action)
+
+        move = moves.get(action)
+        if move is not None:
+            if move[0]: player.vx = move[0]*player.speed
+            if move[1]: player.vy = move[1]*player.speed
+        elif fire and action == 5:
+            if not bbullet.active:
+                bbullet.activate(player.x+(player.w*0.5), player.y)
+
+    return apply
+
+
+# continuous actions are (vertical, horizontal, fire), the player does not move while firing
+def continuous_routine(vertical, horizontal, fire):
+
+    def apply(player, bbullet, action):
+        if action[2] <= 0.0:
+            if vertical:
+                player.vy = player.speed*action[0]
+            if horizontal:
+                player.vx = player.speed*action[1]
+
+        elif fire and not bbullet.active:
+            bbullet.activate(player.x+(player.w*0.5), player.y)
+
+    return apply
@@ -0,0 +1,51 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+import cv2
+
+# hsv channel ranges of opencv
+HSV_SCALE = np.array([179.0, 255.0, 255.0], dtype=np.float32)
+
+# apply hsv shifts (an array of hue, saturation and value shifts) and inversion to an
+# (h, w, 3) RGB uint8 image, writing into out. hsv and hsv_float are work arrays of the
+# same shape, with types uint8 and float32
+def shift_colors(ra, out, hsv_shift, invert, hsv, hsv_float):
+
+    # get normalized hsv
+    cv2.cvtColor(ra, cv2.COLOR_RGB2HSV, dst=hsv) #hsv image with values [0-179, 0-255, 0-255]
+    np.copyto(hsv_float, hsv)
+    np.divide(hsv_float, HSV_SCALE, out=hsv_float)
+
+    # apply hsv shifts
+    np.add(hsv_float, hsv_shift, out=hsv_float)
+    np.mod(hsv_float[:,:,0], 1.0, out=hsv_float[:,:,0])
+    np.clip(hsv_float[:,:,1:], 0.0, 1.0, out=hsv_float[:,:,1:])
+
+    #convert back to [0-255] rgb
+    np.multiply(hsv_float, HSV_SCALE, out=hsv_float)
+    np.copyto(hsv, hsv_float, casting="unsafe")
+    ra = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB, dst=out)
+
+    if invert:
+        np.subtract(255, ra, out=ra)
+
+    return ra
@@ -0,0 +1,91 @@
+"""
+Copyright © 2021 The Johns Hopkins University Applied Physics Laboratory LLC
+ 
+Permission is hereby granted, free of charge, to any person obtaining a copy 
+of this software and associated documentation files (the “Software”), to 
+deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+sell copies of the Software, and to permit persons to whom the Software is 
+furnished to do so, subject to the following conditions:
+ 
+The above copyright notice and this permission notice shall be included in 
+all copies or substantial portions of the Software.
+ 
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR 
+IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+# numba kernels for the array physics (physics="compiled"), compiling the loop over
+# the blocks. this module is only imported when the compiled physics is used, so
+# numba is an optional dependency
+
+import numba
+
+
+def jit(f):
+    return numba.njit(cache=True)(f)
+
+
+# rows of the others array given to subtick_blocks, in the order of the game elements
+BLUE_BULLET, RED_BULLET, PLAYER = 0, 1, 2
+
+
+# subtick of every block in list order, as in Block.subtick. blocks wrap around the screen,
+# and are destroyed by the first element they touch out of the blue bullet, red bullet and player.
+# others: (3, 5) array of (active, left, right, top, bottom) of these elements, the bullets
+# which destroy a block are deactivated in it.
+# blocks after one that ends the game are not processed.
+# returns the change in score, whether the game is over and whether any block wrapped
+@jit
+def subtick_blocks(x, y, w, h, vx, vy, alive, active, bad, worth, fall_points, others, dscore):
+
+    wrapped = False
+    for i in range(len(x)):
+
+        fell = False
+        if vx[i] > 0.0 and x[i] > 1.0:
+            x[i] = -w[i]
+            alive[i] = True
+            wrapped = True
+        elif vx[i] < 0.0 and x[i] < -w[i]:
+            x[i] = 1.0
+            alive[i] = True
+            wrapped = True
+        elif vy[i] > 0.0 and y[i] > 1.0:
+            y[i] = 0.0 - h[i]
+            fell = alive[i]
+            alive[i] = True
+            wrapped = True
+
+        score = 0.0
+        if fell:
+            score = fall_points[i]
+        elif alive[i] and active[i]:
+            r = x[i] + w[i]
+            b = y[i] + h[i]
+            for k in range(3):
+                if (others[k, 0] > 0.0 and x[i] < others[k, 2] and others[k, 1] < r 
+                    and y[i] < others[k, 4] and others[k, 3] < b):
+                    alive[i] = False
+                    if k == BLUE_BULLET:
+                        others[k, 0] = 0.0
+                        score = worth[i]
+                    elif k == RED_BULLET:
+                        others[k, 0] = 0.0
+                    elif bad[i]:
+                        score = -100.0
+                    else:
+                        score = worth[i]
+                    break
+
+        if score >= 100.0:
+            return 100.0, True, wrapped
+        elif score <= -100.0:
+            return -100.0, True, wrapped
+        dscore += score
+
+    return dscore, False, wrapped
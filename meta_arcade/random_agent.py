@@ -74,7 +74,7 @@ def get_first_frames(env, episodes, rows=1, udlr=False, capture_wait=0):
         timedown = capture_wait
         while not done:
             if timedown==0:
-                frames.append(s)
+                frames.append(np.array(s))
             timedown -= 1
             a = env.action_space.sample()
             s, r, done, info = env.step(a)
@@ -50,5 +50,8 @@ setup(
         'numpy',
         'pygame',
         'opencv-python'
-    ]
+    ],
+    extras_require={
+        'numba': ['numba']
+    }
 )
\ No newline at end of file
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from meta_arcade.MetaArcade import MetaArcade
+
+
+def player_x_after(action):
+    env = MetaArcade("pong", headless=True, render_backend="numpy")
+    env.reset()
+    env.step(action)
+    return env.player.x
+
+
+class Scalar():
+    # array-like scalar hashed by identity, such as a torch tensor
+    def __init__(self, value):
+        self.value = value
+
+    def __int__(self):
+        return self.value
+
+
+@pytest.mark.parametrize("action", [np.array(3), np.array([3]), np.int64(3), 3.0, Scalar(3)])
+def test_numpy_discrete_actions(action):
+    assert player_x_after(action) == player_x_after(3)
+    assert player_x_after(3) != player_x_after(0)
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from meta_arcade.Config import MAConfig, InterpolationPlan
+from meta_arcade.MetaArcade import MetaArcade
+
+
+def test_mutating_read_list_does_not_change_cached_game():
+    area = MAConfig("breakout")["blocks_settings"]["creation_area"]
+    original = list(area)
+    area[1] = 0.5
+    assert MAConfig("breakout")["blocks_settings"]["creation_area"] == original
+
+
+def test_mutating_sampled_list_does_not_change_cached_game():
+    values = MAConfig("breakout").sample_constant_values()
+    original = list(values["blocks_settings"]["creation_area"])
+    values["blocks_settings"]["creation_area"][1] = 0.5
+    fresh = MAConfig("breakout").sample_constant_values()
+    assert fresh["blocks_settings"]["creation_area"] == original
+
+
+def test_assignment_does_not_change_cached_game():
+    cfg = MAConfig("breakout")
+    original = cfg["player_settings"]["width"]
+    cfg["player_settings"]["width"] = original + 0.1
+    assert cfg["player_settings"]["width"] == original + 0.1
+    assert MAConfig("breakout")["player_settings"]["width"] == original
+
+
+def test_variant_section_assignment_replaces_section():
+    base = MAConfig("breakout")
+    variant = base.variant()
+    variant["ball_settings"] = {"speed": 0.02}
+    assert variant.original_dict["ball_settings"] == {"speed": 0.02}
+    variant["ball_settings"]["size"] = 0.05
+    assert variant.original_dict["ball_settings"] == {"speed": 0.02, "size": 0.05}
+    assert "color" in base["ball_settings"]
+
+
+def test_variant_changes_merge_into_sections():
+    base = MAConfig("breakout")
+    variant = base.variant({"ball_settings": {"speed": 0.02}})
+    assert variant["ball_settings"]["speed"] == 0.02
+    assert variant["ball_settings"]["size"] == base["ball_settings"]["size"]
+
+
+def test_variant_copies_changes():
+    changes = {"ball_settings": {"speed": 0.02}}
+    variant = MAConfig("breakout").variant(changes)
+    changes["ball_settings"]["speed"] = 0.03
+    changes["player_settings"] = {"width": 0.5}
+    assert variant["ball_settings"]["speed"] == 0.02
+    assert variant["player_settings"]["width"] != 0.5
+
+
+def plain(value):
+    if isinstance(value, MAConfig):
+        value = value.original_dict
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [plain(v) for v in value]
+    return value
+
+
+@pytest.mark.parametrize("progress", [0.0, 0.5, 1.0])
+def test_interpolation_plan_matches_interpolate_towards(progress):
+    config1, config2 = MAConfig("breakout"), MAConfig("pong_breakout")
+    plan = InterpolationPlan(config1, config2)
+    assert plain(plan.at(progress)) == plain(config1.interpolate_towards(config2, progress))
+
+
+def test_variant_section_dictionary_does_not_change_base():
+    base = MAConfig("pong")
+    speed = base["ball_settings"]["speed"]
+    variant = base.variant()
+    section = variant["ball_settings"].parameter_dictionary()
+    section["speed"] = 99
+    assert variant["ball_settings"]["speed"] == 99
+    assert base["ball_settings"]["speed"] == speed
+    assert MAConfig("pong")["ball_settings"]["speed"] == speed
+
+
+def test_variant_dictionary_does_not_change_base():
+    base = MAConfig("breakout")
+    width = base["player_settings"]["width"]
+    variant = base.variant()
+    variant.parameter_dictionary()["player_settings"]["width"] = 0.9
+    assert variant["player_settings"]["width"] == 0.9
+    assert base["player_settings"]["width"] == width
+    assert MAConfig("breakout")["player_settings"]["width"] == width
+
+
+def test_sample_columns_within_ranges():
+    config = MAConfig("breakout").variant({
+        "ball_settings": {"speed": {"distribution": "uniform", "low": 0.008, "high": 0.015},
+            "color": {"distribution": "color", "lrange": [0.2, 0.6]}},
+        "blocks_settings": {"rows": {"distribution": "uniform", "low": 2, "high": 7}},
+        "display_settings": {"background_color": {"distribution": "normal", 
+            "mean": [128, 128, 128], "std": [200, 200, 200]}},
+    })
+    columns = config.sample_columns(16, np.random.default_rng(0))
+
+    speed = columns[("ball_settings", "speed")]
+    assert speed.shape == (16,)
+    assert ((0.008 <= speed) & (speed <= 0.015)).all()
+
+    rows = columns[("blocks_settings", "rows")]
+    assert rows.shape == (16,)
+    assert ((2 <= rows) & (rows <= 7)).all()
+
+    for path in [("ball_settings", "color"), ("display_settings", "background_color")]:
+        assert columns[path].shape == (16, 3)
+        assert ((0 <= columns[path]) & (columns[path] <= 255)).all()
+
+
+def test_values_at_gives_playable_config():
+    config = MAConfig("breakout").variant({
+        "ball_settings": {"color": {"distribution": "color"}},
+        "blocks_settings": {"rows": {"distribution": "uniform", "low": 2, "high": 7}},
+    })
+    columns = config.sample_columns(4, np.random.default_rng(0))
+    for i in range(4):
+        values = config.values_at(columns, i)
+        assert isinstance(values["blocks_settings"]["rows"], int)
+        assert values["ball_settings"]["color"] == columns[("ball_settings", "color")][i].tolist()
+        env = MetaArcade(values, headless=True, render_backend="numpy")
+        assert env.reset().shape == (84, 84, 3)
+        env.step(0)
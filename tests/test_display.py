@@ -0,0 +1,20 @@
+import pytest
+
+from meta_arcade.Config import MAConfig
+from meta_arcade.MetaArcade import MetaArcade
+
+
+def indicators(backend, up):
+    config = MAConfig("pong").sample_constant_values()
+    config["actions"]["up"] = up
+    env = MetaArcade(config, headless=True, render_backend=backend, native_resolution=True)
+    obs = env.reset()
+    env.close()
+    # indicator of the up action, the first in the bottom ui bar
+    size = obs.shape[0]
+    return obs[int(size*0.94):, :int(size*0.2)]
+
+
+@pytest.mark.parametrize("backend", ["pygame", "numpy"])
+def test_action_indicators_visible_at_native_resolution(backend):
+    assert (indicators(backend, True) != indicators(backend, False)).any()
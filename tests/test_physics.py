@@ -0,0 +1,37 @@
+import random
+import sys
+
+import pytest
+
+from meta_arcade.MetaArcade import MetaArcade
+
+
+def trace(game, physics, steps=400):
+    env = MetaArcade(game, headless=True, render_backend="numpy", physics=physics)
+    env.seed(0)
+    env.reset(render_obs=False)
+    actions = random.Random(0)
+    states = []
+    for i in range(steps):
+        _, reward, done, _ = env.step(actions.randrange(6), render_obs=False)
+        states.append((reward, done, [(e.x, e.y, e.vx, e.vy, e.active) for e in env.game_elements]))
+        if done:
+            env.reset(render_obs=False)
+    return states
+
+
+@pytest.mark.parametrize("game", ["breakout", "erosion", "invasion", "pong_breakout"])
+def test_array_physics_matches_elements(game):
+    assert trace(game, "array") == trace(game, "elements")
+
+
+@pytest.mark.parametrize("game", ["breakout", "erosion"])
+def test_compiled_physics_matches_elements(game):
+    pytest.importorskip("numba")
+    assert trace(game, "compiled") == trace(game, "elements")
+
+
+def test_compiled_physics_requires_numba(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numba", None)
+    with pytest.raises(ImportError, match="numba"):
+        MetaArcade("breakout", headless=True, render_backend="numpy", physics="compiled")
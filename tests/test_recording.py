@@ -0,0 +1,34 @@
+import imageio
+import numpy as np
+
+from meta_arcade import EpisodeRecorder
+from meta_arcade.MetaArcade import MetaArcade
+
+
+def test_recorded_episode_matches_frames(tmp_path):
+    path = str(tmp_path / "episode.gif")
+    env = MetaArcade("pong", headless=True, render_backend="numpy", episode_as_gif_path=path)
+    env.seed(0)
+    env.reset()
+    frames = [np.array(env.display.get_pixels())]
+    for i in range(20):
+        env.step(i % 6)
+        frames.append(np.array(env.display.get_pixels()))
+    env.close()
+
+    recorded = imageio.mimread(path)
+    assert len(recorded) == len(frames)
+    assert np.array_equal(np.asarray(recorded[0])[:, :, :3], frames[0])
+
+
+def test_close_registered_once_at_exit(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(EpisodeRecorder.atexit, "register", registered.append)
+    path = str(tmp_path / "episode_{episode}.gif")
+    env = MetaArcade("pong", headless=True, render_backend="numpy", episode_as_gif_path=path)
+    for i in range(3):
+        env.reset()
+        env.step(0)
+        # closing stops the background thread, which the next episode starts again
+        env.close()
+    assert len(registered) == 1